@@ -11,52 +11,954 @@
 # - QUANTUMFIELD (ΨQF): Nueva partícula para generación de campos de compresión
 
 import numpy as np
+import bisect
+import contextlib
+import json
+import mmap
 import struct
 import zlib
+import lzma
+import bz2
 import os
+import sys
+import hashlib
+import io
 import time
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from collections import defaultdict, deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 import multiprocessing
 
-class QuantumField:
+# Índice de bloques (v13): una entrada por bloque al final del archivo.
+# comp_offset/comp_len delimitan la trama completa (cabecera 'II' incluida) y
+# raw_offset/raw_len su posición en el archivo original.
+BLOCK_INDEX_DTYPE = np.dtype([
+    ('comp_offset', '<u8'),
+    ('comp_len', '<u4'),
+    ('raw_offset', '<u8'),
+    ('raw_len', '<u4'),
+])
+INDEX_TRAILER = struct.Struct('<QI4s')  # offset del índice, nº de bloques, firma
+INDEX_MAGIC = b'DKI\x00'
+
+# Formato de flujo: sin tamaño en la cabecera; las tramas terminan con una
+# trama vacía (fin de flujo) seguida del tamaño original total.
+STREAM_FLAG = 0x80
+END_OF_STREAM = struct.pack('II', 0, 0)
+STREAM_TRAILER = struct.Struct('<Q')
+
+# Modo archivo (varios miembros): versión | ARCHIVE_FLAG. Tras el índice de
+# bloques va el directorio central (una entrada + nombre UTF-8 por miembro) y
+# su trailer, justo antes del trailer del índice.
+ARCHIVE_FLAG = 0x40
+# longitud del nombre, tamaño, offset en la concatenación, primer bloque, nº de bloques, blake2b-16
+DIRECTORY_ENTRY = struct.Struct('<HQQII16s')
+DIRECTORY_TRAILER = struct.Struct('<QI4s')  # offset del directorio, nº de miembros, firma
+DIRECTORY_MAGIC = b'DKC\x00'
+
+# Tipos de bloque: 0-3 son los tipos fijos de zlib de la v12; BLOCK_CODEC
+# lleva a continuación el id de codec y el nivel usados.
+BLOCK_CODEC = 0x04
+LEGACY_BLOCK_CODECS = {0: 'zlib', 2: 'zlib', 3: 'store'}
+# BLOCK_FILTERED: id de filtro, parámetro, id de codec y nivel; el payload es
+# el bloque preacondicionado y comprimido.
+BLOCK_FILTERED = 0x05
+# BLOCK_COLUMNAR: id de codec y nivel seguidos de un bloque de filas '|'
+# separado en columnas (ver ``TblColumnar``).
+BLOCK_COLUMNAR = 0x06
+# BLOCK_REFERENCE: fragmento duplicado; lleva el nº de bloque original ('<Q').
+# En el índice, su entrada apunta a la trama del bloque original.
+BLOCK_REFERENCE = 0x07
+
+# BLOCK_DICTIONARY: nivel e id ('<I') del diccionario zlib preestablecido
+BLOCK_DICTIONARY = 0x08
+
+# Metadata binaria de trama (v15): tamaño original y CRC32 del payload
+# comprimido y del bloque original, opcionalmente seguidos del resumen por
+# columnas del bloque (``BlockStats``). Las tramas v13/v14 no llevan metadata.
+FRAME_META = struct.Struct('<III')
+
+# Sección de diccionario de la cabecera (v14): id y longitud del diccionario
+# embebido; longitud 0 con id distinto de 0 indica un archivo externo.
+DICTIONARY_SECTION = struct.Struct('<II')
+DICTIONARY_MAGIC = b'DKD\x00'
+
+# Límites de los histogramas de métricas: potencias de 2 desde 1 µs (~2 min)
+HISTOGRAM_BOUNDS = tuple(1e-6 * 2 ** k for k in range(28))
+
+# Tabla Gear para el hash rodante del troceado por contenido (determinista)
+GEAR_TABLE = np.random.default_rng(0x444F454B).integers(0, 2 ** 32, 256, dtype=np.uint32)
+
+class Codec:
     """
-    Implementación de la partícula QUANTUMFIELD (ΨQF).
-    Genera campos de compresión cuántica para optimizar el procesamiento de datos.
+    Backend de compresión registrado bajo un id de un byte.
+    Cada trama guarda el id y el nivel, de modo que la descompresión
+    no depende del perfil con el que se comprimió.
     """
-    def __init__(self, field_strength=0.95, field_density=0.90):
-        self.field_strength = field_strength
-        self.field_density = field_density
-        self.field_state = None
-        
-    def generate_field(self, data_shape):
-        """Genera un campo cuántico adaptativo."""
-        field = np.random.random(data_shape) * self.field_strength
-        field = np.exp(1j * np.pi * field)
-        field = field / np.abs(field).max()
-        self.field_state = field
-        return field
-        
-    def apply_field(self, data):
-        """Aplica el campo cuántico a los datos."""
-        if self.field_state is None:
-            self.generate_field(data.shape)
-        transformed = data * np.abs(self.field_state)
-        return np.clip(transformed, 0, 255).astype(np.uint8)
-        
-    def collapse_field(self):
-        """Colapsa el campo cuántico actual."""
-        self.field_state = None
+    def __init__(self, codec_id: int, name: str, compress, decompress, max_level: int = 9):
+        self.codec_id = codec_id
+        self.name = name
+        self._compress = compress
+        self._decompress = decompress
+        self.max_level = max_level
+
+    def compress(self, data: bytes, level: int) -> bytes:
+        if not 0 <= level <= self.max_level:
+            raise ValueError(f"Nivel {level} fuera de rango para {self.name}")
+        return self._compress(data, level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompress(data)
+
+CODECS = {}
+
+def register_codec(codec: Codec):
+    """Registra un codec por id y por nombre."""
+    if codec.codec_id in CODECS and CODECS[codec.codec_id].name != codec.name:
+        raise ValueError(f"Id de codec {codec.codec_id} ya registrado")
+    CODECS[codec.codec_id] = codec
+    CODECS[codec.name] = codec
+
+def get_codec(key) -> Codec:
+    """Busca un codec por id numérico o por nombre."""
+    try:
+        return CODECS[key]
+    except KeyError:
+        raise ValueError(f"Codec desconocido: {key}") from None
+
+register_codec(Codec(0, 'store', lambda data, level: bytes(data), bytes, max_level=0))
+register_codec(Codec(1, 'zlib', lambda data, level: zlib.compress(data, level), zlib.decompress))
+register_codec(Codec(2, 'lzma', lambda data, level: lzma.compress(data, preset=level), lzma.decompress))
+register_codec(Codec(3, 'bz2', lambda data, level: bz2.compress(data, compresslevel=max(1, level)), bz2.decompress))
+
+# Preacondicionadores reversibles y vectorizados: id -> (nombre, directo, inverso).
+# Todos reciben y devuelven arrays uint8 y un parámetro de un byte. Los que no
+# cambian el tamaño escriben en ``out`` si se da (buffer de trabajo reutilizable).
+def _delta_encode(data: np.ndarray, stride: int, out: np.ndarray = None) -> np.ndarray:
+    """Diferencias entre bytes separados por ``stride`` (aritmética módulo 256)."""
+    encoded = np.empty_like(data) if out is None else out
+    encoded[:stride] = data[:stride]
+    np.subtract(data[stride:], data[:-stride], out=encoded[stride:])
+    return encoded
+
+def _delta_decode(data: np.ndarray, stride: int, out: np.ndarray = None) -> np.ndarray:
+    decoded = np.empty_like(data) if out is None else out
+    for lane in range(min(stride, len(data))):
+        np.cumsum(data[lane::stride], dtype=np.uint8, out=decoded[lane::stride])
+    return decoded
+
+def _shuffle_encode(data: np.ndarray, width: int, out: np.ndarray = None) -> np.ndarray:
+    """Agrupa el byte i de cada registro de ``width`` bytes en un mismo plano."""
+    shuffled = np.empty_like(data) if out is None else out
+    body = len(data) - len(data) % width
+    shuffled[:body].reshape(width, -1)[:] = data[:body].reshape(-1, width).T
+    shuffled[body:] = data[body:]
+    return shuffled
+
+def _shuffle_decode(data: np.ndarray, width: int, out: np.ndarray = None) -> np.ndarray:
+    restored = np.empty_like(data) if out is None else out
+    body = len(data) - len(data) % width
+    restored[:body].reshape(-1, width)[:] = data[:body].reshape(width, -1).T
+    restored[body:] = data[body:]
+    return restored
+
+def _rle_encode(data: np.ndarray, _param: int = 0, out: np.ndarray = None) -> np.ndarray:
+    """Codificación por carreras: nº de carreras, valores y longitudes (máx. 255)."""
+    if len(data) == 0:
+        return np.zeros(4, dtype=np.uint8)
+    starts = np.concatenate(([0], np.flatnonzero(data[1:] != data[:-1]) + 1))
+    lengths = np.diff(np.append(starts, len(data)))
+    pieces = (lengths + 254) // 255
+    values = np.repeat(data[starts], pieces)
+    run_lengths = np.full(len(values), 255, dtype=np.uint8)
+    run_lengths[np.cumsum(pieces) - 1] = lengths - 255 * (pieces - 1)
+    header = np.frombuffer(struct.pack('<I', len(values)), dtype=np.uint8)
+    return np.concatenate((header, values, run_lengths))
+
+def _rle_decode(data: np.ndarray, _param: int = 0, out: np.ndarray = None) -> np.ndarray:
+    count = struct.unpack('<I', data[:4].tobytes())[0]
+    return np.repeat(data[4:4 + count], data[4 + count:4 + 2 * count])
+
+PRECONDITIONERS = {
+    1: ('delta', _delta_encode, _delta_decode),
+    2: ('shuffle', _shuffle_encode, _shuffle_decode),
+    3: ('rle', _rle_encode, _rle_decode),  # Cambia el tamaño: ignora ``out``
+}
+SIZE_PRESERVING_PRECONDITIONERS = (1, 2)
+# Candidatos (id, parámetro) evaluados por bloque sobre una muestra
+PRECONDITION_CANDIDATES = ((1, 1), (1, 2), (1, 4), (2, 2), (2, 4), (2, 8), (3, 0))
+
+class TblColumnar:
+    """
+    Codificación columnar de bloques de filas delimitadas por '|' (formato
+    ``.tbl`` de TPC-H). Cada columna se comprime por separado:
+
+    - enteros y decimales de escala fija como enteros escalados, con delta
+      cuando reduce el ancho, en el tipo más estrecho y con planos de bytes;
+    - cadenas de baja cardinalidad como diccionario + códigos;
+    - el resto como texto separado por '\\n'.
+
+    Cada codificación se verifica contra los bytes originales, así que el
+    bloque se reconstruye exactamente.
+    """
+    HEADER = struct.Struct('<BIH')         # flags, filas, columnas
+    COLUMN = struct.Struct('<BBBI')        # tipo, escala, ancho, longitud
+    TEXT, INT, INT_DELTA, DICT = range(4)
+    ENDS_WITH_NEWLINE = 0x01
+    INT_TYPES = ((1, np.int8), (2, np.int16), (4, np.int32), (8, np.int64))
+
+    @staticmethod
+    def split_rows(block: bytes):
+        """Devuelve (filas divididas en campos, termina en salto de línea) o None si no es tabular."""
+        lines = block.split(b'\n')
+        ends_with_newline = lines[-1] == b''
+        if ends_with_newline:
+            lines.pop()
+        if len(lines) < 2:
+            return None
+        rows = [line.split(b'|') for line in lines]
+        width = len(rows[0])
+        if width < 2 or any(len(row) != width for row in rows):
+            return None
+        return rows, ends_with_newline
+
+    @staticmethod
+    def join_rows(columns: list, ends_with_newline: bool) -> bytes:
+        data = b'\n'.join(map(b'|'.join, zip(*columns)))
+        return data + b'\n' if ends_with_newline else data
+
+    @staticmethod
+    def _format_scaled(values, scale: int) -> list:
+        if not scale:
+            return [b'%d' % value for value in values]
+        unit = 10 ** scale
+        return [
+            b'%s%d.%0*d' % (b'-' if value < 0 else b'', abs(value) // unit, scale, abs(value) % unit)
+            for value in values
+        ]
+
+    @classmethod
+    def _narrowest(cls, values: np.ndarray) -> tuple:
+        low, high = int(values.min()), int(values.max())
+        for width, dtype in cls.INT_TYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return width, dtype
+
+    @classmethod
+    def _encode_int(cls, values: list):
+        """Devuelve (tipo, escala, ancho, bytes) si la columna es numérica canónica."""
+        first = values[0]
+        scale = len(first) - first.index(b'.') - 1 if b'.' in first else 0
+        if scale > 255:  # La escala se guarda en un byte
+            return None
+        try:
+            scaled = [int(value.replace(b'.', b'', 1)) for value in values]
+            array = np.array(scaled, dtype=np.int64)
+        except (ValueError, OverflowError):
+            return None
+        if cls._format_scaled(scaled, scale) != values:
+            return None
+
+        kind, (width, dtype) = cls.INT, cls._narrowest(array)
+        if np.abs(array).max() < 2 ** 62:
+            deltas = np.diff(array, prepend=np.int64(0))
+            delta_width, delta_dtype = cls._narrowest(deltas)
+            if delta_width < width:
+                kind, width, dtype, array = cls.INT_DELTA, delta_width, delta_dtype, deltas
+        planes = _shuffle_encode(array.astype(dtype).view(np.uint8), width)
+        return kind, scale, width, planes
+
+    @classmethod
+    def _decode_int(cls, kind: int, scale: int, width: int, data: bytes) -> list:
+        dtype = dict(cls.INT_TYPES)[width]
+        array = _shuffle_decode(np.frombuffer(data, dtype=np.uint8), width).view(dtype).astype(np.int64)
+        if kind == cls.INT_DELTA:
+            array = np.cumsum(array)
+        return cls._format_scaled(array.tolist(), scale)
+
+    @classmethod
+    def encode(cls, block: bytes, codec: Codec, level: int):
+        """Codifica un bloque de filas completas; devuelve None si no es tabular."""
+        split = cls.split_rows(block)
+        if split is None or len(split[0][0]) > 0xFFFF:  # Nº de columnas en un uint16
+            return None
+        rows, ends_with_newline = split
+        columns = [list(column) for column in zip(*rows)]
+
+        headers, payloads = [], []
+        for values in columns:
+            encoded = cls._encode_int(values)
+            if encoded is not None:
+                kind, scale, width, data = encoded
+                payload = codec.compress(data, level)
+            else:
+                unique = dict.fromkeys(values)
+                scale = 0
+                if len(unique) <= min(65535, len(values) // 4):
+                    kind, width = cls.DICT, 1 if len(unique) <= 256 else 2
+                    codes = {value: code for code, value in enumerate(unique)}
+                    dtype = np.uint8 if width == 1 else np.uint16
+                    code_array = np.fromiter((codes[value] for value in values), dtype=dtype, count=len(values))
+                    dictionary = codec.compress(b'\n'.join(unique), level)
+                    payload = struct.pack('<I', len(dictionary)) + dictionary + codec.compress(code_array, level)
+                else:
+                    kind, width = cls.TEXT, 0
+                    payload = codec.compress(b'\n'.join(values), level)
+            headers.append(cls.COLUMN.pack(kind, scale, width, len(payload)))
+            payloads.append(payload)
+
+        flags = cls.ENDS_WITH_NEWLINE if ends_with_newline else 0
+        return cls.HEADER.pack(flags, len(rows), len(columns)) + b''.join(headers) + b''.join(payloads)
+
+    @classmethod
+    def decode(cls, data: bytes, codec: Codec, columns=None) -> tuple:
+        """
+        Decodifica las columnas pedidas (todas si ``columns`` es None) sin
+        descomprimir las demás. Devuelve (columnas, termina en salto de línea).
+        """
+        flags, _rows, column_count = cls.HEADER.unpack_from(data)
+        offset = cls.HEADER.size + column_count * cls.COLUMN.size
+        layout = []
+        for i in range(column_count):
+            kind, scale, width, length = cls.COLUMN.unpack_from(data, cls.HEADER.size + i * cls.COLUMN.size)
+            layout.append((kind, scale, width, offset, length))
+            offset += length
+
+        wanted = range(column_count) if columns is None else columns
+        decoded = []
+        for index in wanted:
+            kind, scale, width, offset, length = layout[index]
+            payload = data[offset:offset + length]
+            if kind in (cls.INT, cls.INT_DELTA):
+                decoded.append(cls._decode_int(kind, scale, width, codec.decompress(payload)))
+            elif kind == cls.DICT:
+                dictionary_size = struct.unpack_from('<I', payload)[0]
+                dictionary = codec.decompress(payload[4:4 + dictionary_size]).split(b'\n')
+                dtype = np.uint8 if width == 1 else np.uint16
+                codes = np.frombuffer(codec.decompress(payload[4 + dictionary_size:]), dtype=dtype)
+                decoded.append([dictionary[code] for code in codes.tolist()])
+            else:
+                decoded.append(codec.decompress(payload).split(b'\n'))
+        return decoded, bool(flags & cls.ENDS_WITH_NEWLINE)
+
+class BlockStats:
+    """
+    Resumen por columna de un bloque de filas '|': filas nulas (campo vacío),
+    mínimo y máximo (numéricos si toda la columna lo es; si no, bytes con un
+    prefijo de hasta ``PREFIX`` bytes) y un filtro de Bloom pequeño cuando la
+    columna tiene pocos valores distintos. Va al final de la metadata de la
+    trama y permite a ``scan`` saltarse los bloques que no pueden cumplir un
+    predicado.
+    """
+    HEADER = struct.Struct('<IH')          # filas, columnas
+    COLUMN = struct.Struct('<BI')          # flags, nulos
+    NUMERIC = struct.Struct('<dd')         # mínimo, máximo
+    IS_NUMERIC, HAS_BLOOM, MAX_TRUNCATED = 0x01, 0x02, 0x04
+    PREFIX = 32
+    BLOOM_MAX_VALUES = 1024                # Más valores distintos: solo mínimo/máximo
+    BLOOM_HASHES = 3
+    OPERATORS = ('==', '!=', '<', '<=', '>', '>=', 'between', 'in', 'null', 'not null')
+
+    @classmethod
+    def _bloom_positions(cls, key: bytes, bits: int):
+        h1, h2 = zlib.crc32(key), zlib.adler32(key) | 1
+        return [(h1 + i * h2) % bits for i in range(cls.BLOOM_HASHES)]
+
+    @classmethod
+    def _bloom(cls, keys) -> bytes:
+        bits = 64
+        while bits < 8 * len(keys):
+            bits *= 2
+        bloom = np.zeros(bits, dtype=bool)
+        for key in keys:
+            bloom[cls._bloom_positions(key, bits)] = True
+        return np.packbits(bloom, bitorder='little').tobytes()
+
+    @staticmethod
+    def _numeric_key(value: float) -> bytes:
+        return struct.pack('<d', float(value))
+
+    @classmethod
+    def compute(cls, block) -> bytes:
+        """
+        Resumen codificado del bloque (con CRC32 final), o b'' si no es
+        tabular o no termina en fin de fila.
+        """
+        if not block or block[-1:] != b'\n':
+            return b''
+        split = TblColumnar.split_rows(bytes(block))
+        if split is None or len(split[0][0]) > 0xFFFF:  # Nº de columnas en un uint16
+            return b''
+        rows, _ = split
+        parts = [cls.HEADER.pack(len(rows), len(rows[0]))]
+        for values in zip(*rows):
+            present = [value for value in values if value]
+            nulls = len(values) - len(present)
+            flags, body, keys = 0, b'', ()
+            if present:
+                try:
+                    numbers = np.array(present).astype(np.float64)
+                except ValueError:
+                    numbers = None
+                if numbers is not None and np.isfinite(numbers).all():
+                    flags |= cls.IS_NUMERIC
+                    # Extremos redondeados hacia fuera: cotas seguras aunque float64 pierda precisión
+                    body = cls.NUMERIC.pack(np.nextafter(numbers.min(), -np.inf), np.nextafter(numbers.max(), np.inf))
+                    unique = np.unique(numbers)
+                    if len(unique) <= cls.BLOOM_MAX_VALUES:
+                        keys = [cls._numeric_key(value) for value in unique.tolist()]
+                else:
+                    low, high = min(present), max(present)
+                    if len(high) > cls.PREFIX:
+                        flags |= cls.MAX_TRUNCATED
+                    low, high = low[:cls.PREFIX], high[:cls.PREFIX]
+                    body = bytes((len(low), len(high))) + low + high
+                    unique = set(present)
+                    if len(unique) <= cls.BLOOM_MAX_VALUES:
+                        keys = unique
+            if keys:
+                flags |= cls.HAS_BLOOM
+                bloom = cls._bloom(keys)
+                body += struct.pack('<H', len(bloom)) + bloom
+            parts.append(cls.COLUMN.pack(flags, nulls) + body)
+        encoded = b''.join(parts)
+        return encoded + struct.pack('<I', zlib.crc32(encoded))
+
+    @classmethod
+    def check(cls, data) -> bytes:
+        """Valida el CRC32 del resumen y devuelve el cuerpo."""
+        body = bytes(data[:-4])
+        if len(data) < cls.HEADER.size + 4 or struct.unpack_from('<I', data, len(data) - 4)[0] != zlib.crc32(body):
+            raise ValueError("Estadísticas de bloque dañadas")
+        return body
+
+    @classmethod
+    def decode(cls, data) -> tuple:
+        """Devuelve (filas, [resumen por columna]) a partir del resumen codificado."""
+        body = cls.check(data)
+        rows, column_count = cls.HEADER.unpack_from(body)
+        offset = cls.HEADER.size
+        columns = []
+        for _ in range(column_count):
+            flags, nulls = cls.COLUMN.unpack_from(body, offset)
+            offset += cls.COLUMN.size
+            column = {'nulls': nulls, 'numeric': bool(flags & cls.IS_NUMERIC),
+                      'truncated': bool(flags & cls.MAX_TRUNCATED), 'min': None, 'max': None, 'bloom': None}
+            if nulls < rows:
+                if column['numeric']:
+                    column['min'], column['max'] = cls.NUMERIC.unpack_from(body, offset)
+                    offset += cls.NUMERIC.size
+                else:
+                    low_len, high_len = body[offset], body[offset + 1]
+                    offset += 2
+                    column['min'] = body[offset:offset + low_len]
+                    column['max'] = body[offset + low_len:offset + low_len + high_len]
+                    offset += low_len + high_len
+            if flags & cls.HAS_BLOOM:
+                size = struct.unpack_from('<H', body, offset)[0]
+                column['bloom'] = np.unpackbits(np.frombuffer(body, np.uint8, size, offset + 2), bitorder='little')
+                offset += 2 + size
+            columns.append(column)
+        return rows, columns
+
+    @staticmethod
+    def parse_predicate(predicate) -> tuple:
+        """
+        Normaliza un predicado: ``(op, valor)``, ``('between', bajo, alto)``,
+        ``('in', valores)``, ``('null',)``, ``('not null',)`` o una función
+        ``campo -> bool`` (esta última no permite saltar bloques). Los valores
+        int/float comparan numéricamente; str/bytes, como bytes.
+        """
+        if callable(predicate):
+            return 'call', predicate
+        op, *operands = predicate
+        if op not in BlockStats.OPERATORS:
+            raise ValueError(f"Operador desconocido: {op}")
+
+        def normalize(value):
+            if isinstance(value, str):
+                return value.encode('utf-8')
+            if isinstance(value, (bytes, int, float)) and not isinstance(value, bool):
+                return value
+            raise ValueError(f"Valor de predicado no soportado: {value!r}")
+
+        if op == 'in':
+            operands = [tuple(normalize(value) for value in operands[0])]
+        else:
+            operands = [normalize(value) for value in operands]
+        expected = {'between': 2, 'null': 0, 'not null': 0}.get(op, 1)
+        if len(operands) != expected:
+            raise ValueError(f"El operador {op} espera {expected} valores")
+        return (op, *operands)
+
+    @staticmethod
+    def _compare(field: bytes, value, op: str) -> bool:
+        if isinstance(value, bytes):
+            left = field
+        else:
+            try:
+                left = float(field)
+            except ValueError:
+                return False
+        if op == '==':
+            return left == value
+        if op == '!=':
+            return left != value
+        if op == '<':
+            return left < value
+        if op == '<=':
+            return left <= value
+        if op == '>':
+            return left > value
+        return left >= value
+
+    @classmethod
+    def matches(cls, field: bytes, predicate: tuple) -> bool:
+        """Evalúa el predicado normalizado sobre un campo; los nulos solo cumplen 'null'."""
+        op = predicate[0]
+        if op == 'call':
+            return bool(predicate[1](field))
+        if op in ('null', 'not null'):
+            return (field == b'') == (op == 'null')
+        if field == b'':
+            return False
+        if op == 'between':
+            return cls._compare(field, predicate[1], '>=') and cls._compare(field, predicate[2], '<=')
+        if op == 'in':
+            return any(cls._compare(field, value, '==') for value in predicate[1])
+        return cls._compare(field, predicate[1], op)
+
+    @staticmethod
+    def _comparable(column: dict, value) -> bool:
+        """Valores numéricos solo se acotan con columnas numéricas, y bytes con columnas de bytes."""
+        return isinstance(value, bytes) != column['numeric']
+
+    @classmethod
+    def _in_bloom(cls, column: dict, value) -> bool:
+        bloom = column['bloom']
+        if bloom is None or not cls._comparable(column, value):
+            return True  # Sin filtro o tipos distintos: no se puede descartar
+        key = value if isinstance(value, bytes) else cls._numeric_key(value)
+        return bool(bloom[cls._bloom_positions(key, len(bloom))].all())
+
+    @classmethod
+    def _may_contain(cls, column: dict, low, high) -> bool:
+        """¿Puede haber valores en [low, high] (None = sin cota)?"""
+        if not cls._comparable(column, low if low is not None else high):
+            return True
+        if high is not None and column['min'] > high:
+            return False
+        if low is not None:
+            if column['truncated'] and isinstance(low, bytes):
+                # El máximo guardado es un prefijo: solo cota si el prefijo ya es menor
+                return column['max'] >= low[:len(column['max'])]
+            return column['max'] >= low
+        return True
+
+    @classmethod
+    def may_match(cls, column: dict, rows: int, predicate: tuple) -> bool:
+        """False solo si ninguna fila del bloque puede cumplir el predicado."""
+        op = predicate[0]
+        if op == 'call':
+            return True
+        if op == 'null':
+            return column['nulls'] > 0
+        if column['nulls'] == rows:
+            return False  # Todo nulos: ningún valor cumple
+        if op == 'not null':
+            return True
+        if op == '==':
+            value = predicate[1]
+            return cls._may_contain(column, value, value) and cls._in_bloom(column, value)
+        if op == 'in':
+            return any(cls._may_contain(column, value, value) and cls._in_bloom(column, value)
+                       for value in predicate[1])
+        if op == 'between':
+            return cls._may_contain(column, predicate[1], predicate[2])
+        value = predicate[1]
+        # Con desigualdad estricta también se descarta el extremo exacto
+        if op == '<':
+            return cls._may_contain(column, None, value) and not (
+                cls._comparable(column, value) and column['min'] == value)
+        if op == '<=':
+            return cls._may_contain(column, None, value)
+        if op == '>':
+            return cls._may_contain(column, value, None) and not (
+                cls._comparable(column, value) and not column['truncated'] and column['max'] == value)
+        if op == '>=':
+            return cls._may_contain(column, value, None)
+        return True  # '!=': casi nunca permite descartar
+
+def dictionary_id(dictionary: bytes) -> int:
+    """Id de 32 bits (nunca 0) derivado del contenido del diccionario."""
+    return int.from_bytes(hashlib.blake2b(dictionary, digest_size=4).digest(), 'little') or 1
+
+def train_dictionary(sample_files: list, size: int = 32 * 1024, segment: int = 512,
+                     sample_bytes: int = 4 * 1024 * 1024) -> bytes:
+    """
+    Entrena un diccionario zlib preestablecido (``zdict``) a partir de
+    archivos representativos.
+
+    Selección por cobertura: la muestra se divide en ``size / segment``
+    épocas y de cada una se toma el segmento cuyos k-mers de 8 bytes son
+    más frecuentes en toda la muestra; los k-mers elegidos dejan de puntuar
+    para no repetir contenido. Los segmentos mejor puntuados quedan al
+    final, donde zlib los alcanza con distancias más cortas.
+    """
+    budget = max(1, sample_bytes // max(1, len(sample_files)))
+    samples = []
+    for path in sample_files:
+        with open(path, 'rb') as f:
+            samples.append(f.read(budget))
+    raw = b''.join(samples)
+    kmer = 8
+    span = segment - kmer + 1
+    if len(raw) <= size or span < 1:
+        return raw[-size:]
+
+    data = np.frombuffer(raw, dtype=np.uint8)
+    kmers = np.ascontiguousarray(np.lib.stride_tricks.sliding_window_view(data, kmer)).view('<u8').ravel()
+    _, inverse, counts = np.unique(kmers, return_inverse=True, return_counts=True)
+    frequency = np.where(counts > 1, counts, 0).astype(np.float64)
+
+    epochs = max(1, size // segment)
+    epoch_size = len(kmers) // epochs
+    pieces = []
+    for epoch in range(epochs):
+        low = epoch * epoch_size
+        high = min(low + epoch_size, len(kmers))
+        if high - low < span:
+            break
+        cumulative = np.concatenate(([0.0], np.cumsum(frequency[inverse[low:high]])))
+        scores = cumulative[span:] - cumulative[:-span]
+        best = int(np.argmax(scores))
+        if scores[best] <= 0:
+            continue
+        start = low + best
+        pieces.append((scores[best], raw[start:start + segment]))
+        frequency[inverse[start:start + span]] = 0
+
+    pieces.sort(key=lambda piece: piece[0])
+    return b''.join(piece for _, piece in pieces)[-size:]
+
+def save_dictionary(dictionary: bytes, path: str) -> int:
+    """Guarda un diccionario externo (firma, id, datos) y devuelve su id."""
+    dict_id = dictionary_id(dictionary)
+    with open(path, 'wb') as f:
+        f.write(DICTIONARY_MAGIC + struct.pack('<I', dict_id) + dictionary)
+    return dict_id
+
+def load_dictionary(path: str) -> bytes:
+    """Lee un diccionario externo guardado con ``save_dictionary``."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != DICTIONARY_MAGIC:
+        raise ValueError(f"No es un diccionario DOEK: {path}")
+    dictionary = data[8:]
+    if struct.unpack_from('<I', data, 4)[0] != dictionary_id(dictionary):
+        raise ValueError(f"Diccionario dañado: {path}")
+    return dictionary
+
+# Perfiles del motor: etapas de la cascada (nombre, codec, nivel, umbral de
+# ratio). Una etapa se acepta si el resultado es menor que umbral * bloque.
+# Las etapas comprimen el bloque ya preacondicionado cuando hay filtro.
+# Si ninguna etapa cumple, el bloque se guarda sin comprimir ('none').
+COMPRESSION_PROFILES = {
+    'fast': (
+        ('direct', 'zlib', 1, 1.0),
+    ),
+    'balanced': (
+        ('direct', 'zlib', 1, 0.5),
+        ('aggressive', 'zlib', 9, 1.0),
+    ),
+    'max': (
+        ('aggressive', 'lzma', 9, 1.0),
+    ),
+}
+
+# Autoajuste: espacio de búsqueda del ``AutoTuner``. Las cascadas siguen el
+# formato de ``COMPRESSION_PROFILES``; cualquier combinación se descomprime
+# igual porque cada trama lleva su codec y nivel.
+TUNING_BLOCK_SIZES = (64 * 1024, 128 * 1024, 256 * 1024, 1024 * 1024)
+TUNING_CASCADES = (
+    (('direct', 'zlib', 1, 1.0),),
+    (('direct', 'zlib', 3, 1.0),),
+    (('direct', 'zlib', 6, 1.0),),
+    (('direct', 'zlib', 1, 0.5), ('aggressive', 'zlib', 9, 1.0)),
+    (('direct', 'zlib', 1, 0.7), ('aggressive', 'zlib', 9, 1.0)),
+    (('direct', 'zlib', 6, 0.7), ('aggressive', 'zlib', 9, 1.0)),
+    (('direct', 'zlib', 9, 1.0),),
+    (('aggressive', 'lzma', 6, 1.0),),
+    (('aggressive', 'lzma', 9, 1.0),),
+)
+TUNING_FILE = os.path.join(os.path.expanduser('~'), '.doek_tuning.json')
+
+def parse_tuning_target(text: str) -> dict:
+    """
+    Interpreta un objetivo de autoajuste. Admite, separados por comas:
+    ``400MB/s`` (velocidad mínima), ``2s/GB`` (tiempo máximo por GB, es
+    decir, velocidad mínima de 512 MB/s), ``ratio<=0.3`` (ratio máximo) y
+    las palabras ``ratio`` o ``speed`` para elegir qué se optimiza.
+    Con solo velocidad mínima se optimiza el ratio, y viceversa.
+    """
+    target = {'min_speed': None, 'max_ratio': None, 'objective': None}
+    for term in text.replace(' ', '').lower().split(','):
+        try:
+            if term in ('ratio', 'speed'):
+                target['objective'] = term
+                continue
+            if term.endswith('mb/s'):
+                key, value = 'min_speed', float(term[:-4].lstrip('>='))
+            elif term.endswith('s/gb'):
+                key, value = 'min_speed', float(term[:-4].lstrip('<='))
+            elif term.startswith('ratio<='):
+                key, value = 'max_ratio', float(term[7:])
+            else:
+                raise ValueError
+            # Solo valores positivos y finitos (también descarta nan)
+            if not 0 < value < float('inf'):
+                raise ValueError
+            target[key] = 1024 / value if term.endswith('s/gb') else value
+        except ValueError:
+            raise ValueError(f"Objetivo de autoajuste inválido: {term!r}") from None
+    if target['objective'] is None:
+        target['objective'] = 'speed' if target['max_ratio'] is not None and target['min_speed'] is None else 'ratio'
+    return target
+
+def tuning_target_key(target: dict) -> str:
+    """Forma canónica de un objetivo, usada como clave del perfil guardado."""
+    terms = [target['objective']]
+    if target['min_speed'] is not None:
+        terms.append(f"speed>={target['min_speed']:g}")
+    if target['max_ratio'] is not None:
+        terms.append(f"ratio<={target['max_ratio']:g}")
+    return ','.join(terms)
+
+class BufferPool:
+    """
+    Pool de buffers reutilizables de tamaño fijo. La etapa lectora llena un
+    buffer con ``readinto`` y la escritora lo devuelve al pool tras escribir
+    su trama, así que no se crea un objeto nuevo por bloque.
+    """
+    def __init__(self, size: int, capacity: int):
+        self.size = size
+        self.capacity = capacity
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return bytearray(self.size)
+
+    def release(self, buffer: bytearray):
+        with self._lock:
+            if len(self._free) < self.capacity:
+                self._free.append(buffer)
+
+class StreamingHistogram:
+    """
+    Histograma de memoria fija con cubetas exponenciales (``HISTOGRAM_BOUNDS``).
+    Cuenta, suma, mínimo y máximo son exactos; los cuantiles se aproximan por
+    el límite superior de su cubeta.
+    """
+    __slots__ = ('buckets', 'count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                break
+        return min(HISTOGRAM_BOUNDS[i], self.max) if i < len(HISTOGRAM_BOUNDS) else self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+class MetricsCollector:
+    """
+    Métricas del motor con memoria acotada: un histograma por (etapa, etiqueta)
+    -- etapas read, classify, transform, compress, decompress y write; la
+    etiqueta es el camino, codec o filtro --, contadores de bytes y bloques por
+    operación, y gauges como la profundidad de la cola del pipeline.
+
+    Los hooks reciben eventos (diccionarios) de progreso en vivo. Exporta a
+    JSON y al formato de texto de Prometheus.
+    """
+    def __init__(self):
+        self.hooks = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = defaultdict(int)
+            self.gauges = {}
+            self.started = time.time()
+
+    def observe(self, stage: str, label: str, value: float):
+        with self._lock:
+            histogram = self.histograms.get((stage, label))
+            if histogram is None:
+                histogram = self.histograms[(stage, label)] = StreamingHistogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, operation: str, value: int = 1):
+        with self._lock:
+            self.counters[(name, operation)] += value
+
+    def gauge(self, name: str, value: float):
+        """Fija un gauge y mantiene su máximo en ``<name>_max``."""
+        with self._lock:
+            self.gauges[name] = value
+            if value > self.gauges.get(name + '_max', value - 1):
+                self.gauges[name + '_max'] = value
+
+    def stage(self, stage: str) -> dict:
+        """Histogramas de una etapa indexados por etiqueta."""
+        with self._lock:
+            return {label: h for (name, label), h in self.histograms.items() if name == stage}
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def emit(self, event: dict):
+        for hook in self.hooks:
+            hook(event)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = defaultdict(dict)
+            for (stage, label), histogram in sorted(self.histograms.items()):
+                stages[stage][label] = histogram.to_dict()
+            counters = defaultdict(dict)
+            for (name, operation), value in sorted(self.counters.items()):
+                counters[name][operation] = value
+            return {
+                'uptime_seconds': time.time() - self.started,
+                'stages': dict(stages),
+                'counters': dict(counters),
+                'gauges': dict(self.gauges),
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = 'doek') -> str:
+        """Formato de exposición de texto de Prometheus."""
+        lines = [f'# TYPE {prefix}_stage_seconds histogram']
+        with self._lock:
+            for (stage, label), histogram in sorted(self.histograms.items()):
+                labels = f'stage="{stage}",label="{label}"'
+                cumulative = 0
+                for bound, bucket in zip(HISTOGRAM_BOUNDS + (float('inf'),), histogram.buckets):
+                    cumulative += bucket
+                    le = '+Inf' if bound == float('inf') else f'{bound:.6g}'
+                    lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {histogram.sum:.9g}')
+                lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {histogram.count}')
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f'# TYPE {prefix}_{name}_total counter')
+                for (counter, operation), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'{prefix}_{name}_total{{operation="{operation}"}} {value}')
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f'# TYPE {prefix}_{name} gauge')
+                lines.append(f'{prefix}_{name} {value}')
+            uptime = time.time() - self.started
+        lines.append(f'# TYPE {prefix}_uptime_seconds gauge')
+        lines.append(f'{prefix}_uptime_seconds {uptime:.3f}')
+        return '\n'.join(lines) + '\n'
+
+def print_progress(event: dict):
+    """
+    Hook de progreso por defecto: la línea ``\\r`` de la consola. Sin total
+    conocido (formato de flujo) se muestran los MB procesados.
+    """
+    label = {'compress': 'Comprimiendo', 'verify': 'Verificando'}.get(event['operation'], 'Descomprimiendo')
+    if event['total'] is None:
+        print(f"\r{label}: {event['done']/1024/1024:.2f} MB", end='', flush=True)
+        return
+    progress = min(event['done'] / event['total'], 1.0) * 100 if event['total'] else 100.0
+    if event['operation'] == 'compress':
+        ratio = event['output_size'] / event['done'] * 100 if event['done'] else 0.0
+        print(f"\r{label}: {progress:.1f}% - Ratio: {ratio:.1f}%", end='', flush=True)
+    else:
+        print(f"\r{label}: {progress:.1f}%", end='', flush=True)
+
+def metrics_file_hook(metrics: MetricsCollector, path: str, interval: float = 5.0):
+    """
+    Hook que vuelca las métricas a ``path`` como mucho cada ``interval``
+    segundos (Prometheus si termina en ``.prom``, si no JSON). La escritura es
+    atómica, así que un recolector puede leer el archivo en cualquier momento.
+    """
+    state = {'last': 0.0}
+
+    def write(event: dict = None):
+        now = time.time()
+        if event is not None and now - state['last'] < interval:
+            return
+        state['last'] = now
+        text = metrics.to_prometheus() if path.endswith('.prom') else metrics.to_json(indent=2)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    return write
 
 class DoekProcessor:
     """
     Procesador optimizado para CPU/GPU con campo cuántico.
+
+    Los núcleos de transformación no crean hilos propios: corren en el hilo
+    que procesa el bloque (el paralelismo lo da el pool del motor) y usan
+    buffers de trabajo por hilo, reservados una vez y reutilizados.
     """
     def __init__(self, Doek_levels=255, dimension_levels=16):
         self.Doek_levels = Doek_levels
         self.dimension_levels = dimension_levels
         self.num_threads = multiprocessing.cpu_count()
-        self.quantum_field = QuantumField()
+        self._local = threading.local()
+        # La transformación inversa (bloques Doek v12) es byte a byte: tabla de
+        # 256 entradas con la misma expresión y el mismo dtype (uint8) que el
+        # cálculo por elemento, así el resultado es idéntico byte a byte.
+        values = np.arange(256, dtype=np.uint8)
+        self._inverse_table = (values * 255 / self.Doek_levels).astype(np.uint8)
         print(f"Usando {self.num_threads} núcleos CPU")
         
         try:
@@ -70,80 +972,116 @@ class DoekProcessor:
         except ImportError:
             self.use_gpu = False
             print("Modo CPU optimizado activo")
+
+    def scratch(self, slot: str, size: int, dtype=np.uint8) -> np.ndarray:
+        """
+        Buffer de trabajo del hilo actual para ``slot``. Crece cuando hace falta
+        y nunca se libera; su contenido solo vale hasta el siguiente uso del
+        mismo slot en el mismo hilo.
+        """
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buffer = buffers.get((slot, dtype))
+        if buffer is None or len(buffer) < size:
+            buffer = buffers[(slot, dtype)] = np.empty(max(size, 1), dtype=dtype)
+        return buffer[:size]
     
-    def process_chunk(self, chunk):
+    def precondition(self, data: np.ndarray, filter_id: int, param: int, slot: str = None) -> np.ndarray:
         """
-        Procesa un chunk de datos con campo cuántico.
-        
-        Partículas utilizadas:
-        - GalacticShard: Para el análisis de entropía
-        - MaxFold: En la transformación de fase
-        - DualQuantum: Para el procesamiento adaptativo
+        Aplica un preacondicionador reversible (ver ``PRECONDITIONERS``). Con
+        ``slot`` el resultado va a un buffer de trabajo del hilo (ver ``scratch``).
         """
-        reshaped = chunk.reshape(-1, self.dimension_levels)
-        
-        # Aplicación del campo cuántico (QUANTUMFIELD)
-        field_processed = self.quantum_field.apply_field(reshaped)
-        
-        # Análisis de entropía usando GalacticShard
-        entropy = np.std(field_processed, axis=1)
-        threshold = np.mean(entropy)
-        
-        # Procesamiento adaptativo usando DualQuantum
-        result = np.zeros_like(reshaped, dtype=np.uint8)
-        
-        # Alta entropía: transformación completa usando MaxFold
-        high_entropy = entropy > threshold
-        if np.any(high_entropy):
-            high_data = field_processed[high_entropy]
-            phase = np.pi * high_data / 255
-            Doek = np.exp(1j * phase)
-            amplitude = np.abs(Doek)
-            normalized = np.clip(amplitude * self.Doek_levels * 1.2, 0, 255)  # Aumentar la normalización
-            result[high_entropy] = normalized.astype(np.uint8)
-        
-        # Baja entropía: transformación simple
-        low_entropy = ~high_entropy
-        if np.any(low_entropy):
-            low_data = field_processed[low_entropy]
-            normalized = np.clip(low_data * self.Doek_levels * 1.2 / 255, 0, 255)  # Aumentar la normalización
-            result[low_entropy] = normalized.astype(np.uint8)
-        
-        return result
+        out = self.scratch(slot, len(data)) if slot and filter_id in SIZE_PRESERVING_PRECONDITIONERS else None
+        return PRECONDITIONERS[filter_id][1](data, param, out)
 
-    def Doek_transform(self, data):
-        """Transformación cuántica paralela con campo."""
-        chunks = np.array_split(data, self.num_threads)
-        
-        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-            results = list(executor.map(self.process_chunk, chunks))
-        
-        self.quantum_field.collapse_field()
-        return np.concatenate(results)
+    def restore(self, data: np.ndarray, filter_id: int, param: int, slot: str = None) -> np.ndarray:
+        """Invierte ``precondition`` byte a byte."""
+        out = self.scratch(slot, len(data)) if slot and filter_id in SIZE_PRESERVING_PRECONDITIONERS else None
+        return PRECONDITIONERS[filter_id][2](data, param, out)
 
-    def inverse_transform(self, data):
-        """Transformación inversa paralela."""
-        chunks = np.array_split(data, self.num_threads)
-        
-        def process_inverse(chunk):
-            return (chunk * 255 / self.Doek_levels).astype(np.uint8)
-            
-        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-            results = list(executor.map(process_inverse, chunks))
-        
-        return np.concatenate(results)
+    def choose_precondition(self, sample: bytes, level: int = 1):
+        """
+        Elige el preacondicionador que más reduce la muestra comprimida con
+        zlib al nivel dado; devuelve ``(id, parámetro)`` o None si ninguno
+        mejora al menos un 5% sobre los datos sin filtrar.
+        """
+        data = np.frombuffer(sample, dtype=np.uint8)
+        best = None
+        best_size = len(zlib.compress(sample, level)) * 0.95
+        for filter_id, param in PRECONDITION_CANDIDATES:
+            size = len(zlib.compress(self.precondition(data, filter_id, param, 'sample'), level))
+            if size < best_size:
+                best, best_size = (filter_id, param), size
+        return best
+
+    def inverse_transform(self, data, out=None):
+        """Transformación inversa: una tabla de 256 entradas, sin temporales en float."""
+        return np.take(self._inverse_table, data, out=out)
 
 class DoekPlanetEngine:
     """
     Motor principal que coordina las cuatro partículas cuánticas.
+
+    El pool de hilos pertenece al motor y se reutiliza entre bloques y
+    archivos; se libera con ``close()`` o usando el motor en un ``with``.
+
+    Args:
+        workers: Número de hilos que comprimen bloques en paralelo
+            (por defecto, uno por núcleo).
+        max_inflight: Máximo de bloques leídos pero aún no escritos; acota la
+            memoria del pipeline a ``max_inflight * block_size``
+            (por defecto, ``2 * workers``).
+        profile: Perfil de compresión de ``COMPRESSION_PROFILES``
+            (``fast``, ``balanced`` o ``max``).
+        precondition: Si se elige un preacondicionador reversible por bloque
+            (ver ``PRECONDITIONERS``) antes de comprimir.
+        columnar: Modo columnar para filas delimitadas por '|'. None lo activa
+            automáticamente para archivos ``.tbl``.
+        dedup: Troceado por contenido con deduplicación entre fragmentos
+            (solo ``compress``; requiere el índice de bloques para leer).
+        dedup_index_size: Máximo de fragmentos recordados por el índice de deduplicación.
+        dedup_eviction: Política de expulsión del índice, ``'lru'`` o ``'fifo'``.
+        dictionary: Diccionario zlib preestablecido (ver ``train_dictionary``)
+            para las etapas zlib.
+        embed_dictionary: Si el diccionario se guarda en la cabecera; si no,
+            solo se guarda su id y hay que registrarlo con ``add_dictionary``
+            antes de descomprimir.
+        zero_copy: E/S sin copias: entrada mapeada con mmap, bloques como
+            ``memoryview`` y tramas escritas con ``writev``. False usa
+            ``read``/``write`` con buffers intermedios (útil para comparar).
+        progress: Hook de progreso en vivo (recibe un diccionario por bloque);
+            por defecto la línea de consola de ``print_progress``, None lo
+            desactiva. Se pueden añadir más con ``metrics.add_hook``.
+        block_size: Tamaño de bloque en bytes (por defecto 256KB).
+        autotune: Objetivo de autoajuste (ver ``parse_tuning_target``), como
+            texto, p. ej. ``'400MB/s'`` o ``'ratio,2s/GB'``, o ya interpretado.
+            ``compress`` elige entonces tamaño de bloque, cascada y hilos con
+            el perfil guardado para el tipo de datos o, si no lo hay, midiendo
+            una muestra de la entrada.
+        tuning_file: Archivo JSON donde se guardan los perfiles autoajustados.
+        stats: Guarda en cada trama un resumen por columna de las filas '|'
+            (``BlockStats``) para que ``scan`` se salte bloques. Con ``columnar``
+            en None activa el corte de bloques por filas; no aplica con ``dedup``.
     """
-    def __init__(self):
+    def __init__(self, workers: int = None, max_inflight: int = None, profile: str = 'balanced',
+                 precondition: bool = True, columnar: bool = None, dedup: bool = False,
+                 dedup_index_size: int = 65536, dedup_eviction: str = 'lru',
+                 dictionary: bytes = None, embed_dictionary: bool = True, zero_copy: bool = True,
+                 progress=print_progress, block_size: int = None, autotune: str = None,
+                 tuning_file: str = TUNING_FILE, stats: bool = False):
         self.extension = '.doek'  # Cambiar a .doek
         self.magic_number = b'DKS\x00'
-        self.version = 12
+        self.version = 15
+        self.legacy_versions = (12,)  # Sin índice: solo lectura secuencial
+        self.indexed_versions = (13, 14, 15)  # v14 añade la sección de diccionario; v15, checksums por trama
+        self.stream_version = self.version | STREAM_FLAG
         self.Doek_levels = 255
-        self.block_size = 1024 * 256  # 256KB blocks
+        self.block_size = block_size or 1024 * 256  # 256KB blocks
         self.dimension_levels = 16
+        self.workers = max(1, workers or multiprocessing.cpu_count())
+        self._max_inflight = max_inflight
+        self.max_inflight = max(self.workers, max_inflight or 2 * self.workers)
         self.processor = DoekProcessor(
             Doek_levels=self.Doek_levels,
             dimension_levels=self.dimension_levels
@@ -151,142 +1089,828 @@ class DoekPlanetEngine:
         self.performance_metrics = {
             'compression_time': 0,
             'decompression_time': 0,
+            'tuning_time': 0,
             'blocks_processed': 0,
             'total_size': 0,
             'compressed_size': 0,
-            'block_times': [],
-            'cpu_usage': [],
-            'field_strength': []  # Nueva métrica para QUANTUMFIELD
         }
+        # Histogramas y contadores de memoria fija (por etapa y camino)
+        self.metrics = MetricsCollector()
+        if progress is not None:
+            self.metrics.add_hook(progress)
+        if profile not in COMPRESSION_PROFILES:
+            raise ValueError(f"Perfil desconocido: {profile}")
+        self.profile = profile
+        self.precondition = precondition
+        self.columnar = columnar
+        self._stats_active = False
+        if dedup_eviction not in ('lru', 'fifo'):
+            raise ValueError(f"Política de expulsión desconocida: {dedup_eviction}")
+        self.dedup = dedup
+        self.dedup_index_size = dedup_index_size
+        self.dedup_eviction = dedup_eviction
+        self.dictionaries = {}
+        self.dictionary_id = self.add_dictionary(dictionary) if dictionary else 0
+        self.embed_dictionary = embed_dictionary
+        self.zero_copy = zero_copy
+        self.stats = stats
+        self.autotune = parse_tuning_target(autotune) if isinstance(autotune, str) else autotune or None
+        self.tuning_file = tuning_file
+        self.compression_stages = {stage[0]: stage for stage in COMPRESSION_PROFILES[profile]}
+        # Clasificador de bloques: caminos en orden de cascada y caché por archivo
+        self.compression_paths = tuple(self.compression_stages) + ('none',)
+        self.classifier_sample_size = 16 * 1024
+        self._decision_lock = threading.Lock()
+        self._start_operation()
+        # Pool de hilos del motor: se crea al primer uso y se reutiliza entre
+        # bloques y archivos hasta ``close()``
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='doek')
+            return self._executor
+
+    def close(self):
+        """Cierra el pool de hilos. El motor sigue siendo usable: el pool se recrea al necesitarse."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def apply_tuning(self, settings: dict):
+        """Aplica un perfil de ``AutoTuner``: tamaño de bloque, cascada de etapas e hilos."""
+        self.block_size = int(settings['block_size'])
+        stages = tuple(tuple(stage) for stage in settings['stages'])
+        self.profile = 'tuned'
+        self.compression_stages = {stage[0]: stage for stage in stages}
+        self.compression_paths = tuple(self.compression_stages) + ('none',)
+        workers = max(1, int(settings['workers']))
+        if workers != self.workers:
+            self.close()  # El pool se recrea con el nuevo tamaño al necesitarse
+            self.workers = workers
+            self.max_inflight = max(workers, self._max_inflight or 2 * workers)
+
+    def tune(self, input_file: str, retune: bool = False) -> dict:
+        """Autoajusta el motor para ``input_file`` según ``autotune`` y devuelve el perfil aplicado."""
+        tuner = AutoTuner(self, self.autotune or parse_tuning_target('ratio'), self.tuning_file)
+        settings = tuner.profile_for(input_file, retune)
+        self.apply_tuning(settings)
+        return settings
+
+    def _entropy_bucket(self, block: bytes) -> int:
+        """
+        Estimación rápida de entropía (GalacticShard) sobre una muestra
+        vectorizada del bloque, cuantizada a cuartos de bit por byte.
+        """
+        data = np.frombuffer(block, dtype=np.uint8)
+        step = max(1, len(data) // self.classifier_sample_size)
+        counts = np.bincount(data[::step], minlength=256)
+        probabilities = counts[counts > 0] / counts.sum()
+        entropy = -np.sum(probabilities * np.log2(probabilities))
+        return int(entropy * 4)
+
+    def _reset_decisions(self):
+        """Vacía la caché de decisiones; cada archivo aprende sus propios caminos."""
+        self._decision_cache = {}
+        self.performance_metrics['classifier'] = {'probes': 0, 'predictions': 0, 'mispredictions': 0}
+        self.performance_metrics['filter_usage'] = defaultdict(int)
+
+    def _start_operation(self, names=()):
+        """
+        Estado de cada operación de compresión: caché de decisiones,
+        contadores de deduplicación y modo columnar. Con ``columnar=None`` el
+        modo columnar se activa si todas las entradas ``names`` son ``.tbl``
+        (o con ``stats``, si hay alguna).
+        """
+        self._reset_decisions()
+        self.performance_metrics['dedup'] = {'chunks': 0, 'hits': 0, 'bytes_saved': 0, 'evictions': 0}
+        if self.columnar is None:
+            self._columnar_active = bool(names) and (self.stats or all(name.endswith('.tbl') for name in names))
+        else:
+            self._columnar_active = bool(self.columnar)
+
+    def _count_decision(self, key: str):
+        with self._decision_lock:
+            self.performance_metrics['classifier'][key] += 1
+
+    @staticmethod
+    def _codec_frame(codec: Codec, level: int, compressed) -> list:
+        """Trama de bloque con id de codec y nivel, como lista de partes."""
+        return [bytes((BLOCK_CODEC, codec.codec_id, level)), compressed]
+
+    @staticmethod
+    def _frame_size(parts: list) -> int:
+        return sum(len(part) for part in parts)
+
+    def _frame_parts(self, parts: list, block, stats: bool = True) -> list:
+        """
+        Trama completa como lista de partes: cabecera 'II', payload y
+        metadata binaria con los CRC32 del payload y de ``block`` (original)
+        y, con ``self.stats`` y bloques cortados por filas, el resumen por
+        columnas del bloque.
+        """
+        payload_crc = 0
+        for part in parts:
+            payload_crc = zlib.crc32(part, payload_crc)
+        meta_data = FRAME_META.pack(len(block), payload_crc, zlib.crc32(block))
+        if self._stats_active and stats:
+            meta_data += BlockStats.compute(block)
+        return [struct.pack('II', self._frame_size(parts), len(meta_data))] + parts + [meta_data]
+
+    def _sample_block(self, block: bytes) -> bytes:
+        """Muestra de ``classifier_sample_size`` bytes en ventanas repartidas por el bloque."""
+        if len(block) <= self.classifier_sample_size:
+            return block
+        windows = 4
+        window = self.classifier_sample_size // windows
+        step = (len(block) - window) // (windows - 1) // 64 * 64  # Alineado a registros
+        return b''.join(block[i * step:i * step + window] for i in range(windows))
+
+    def _prepare_block(self, block: bytes, choice) -> tuple:
+        """
+        Etapa de preacondicionamiento (MaxFold): aplica el filtro elegido y
+        verifica que invierte byte a byte. Devuelve ``(filtro, datos)``; si no
+        hay filtro o la verificación falla, ``(None, bloque)``.
+        """
+        if choice is None:
+            return None, block
+        transform_start = time.time()
+        filter_id, param = choice
+        data = np.frombuffer(block, dtype=np.uint8)
+        filtered = self.processor.precondition(data, filter_id, param, 'precondition')
+        if not np.array_equal(self.processor.restore(filtered, filter_id, param, 'verify'), data):
+            return None, block
+        self.metrics.observe('transform', PRECONDITIONERS[filter_id][0], time.time() - transform_start)
+        return choice, filtered
+
+    def add_dictionary(self, dictionary: bytes) -> int:
+        """Registra un diccionario para descomprimir archivos que lo referencian."""
+        dict_id = dictionary_id(dictionary)
+        self.dictionaries[dict_id] = dictionary
+        return dict_id
+
+    def _compress_with_dictionary(self, data, level: int) -> bytes:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY,
+                                      self.dictionaries[self.dictionary_id])
+        return compressor.compress(data) + compressor.flush()
+
+    def _dictionary_section(self) -> bytes:
+        """Sección de diccionario de la cabecera v14."""
+        if not self.dictionary_id:
+            return DICTIONARY_SECTION.pack(0, 0)
+        if not self.embed_dictionary:
+            return DICTIONARY_SECTION.pack(self.dictionary_id, 0)
+        dictionary = self.dictionaries[self.dictionary_id]
+        return DICTIONARY_SECTION.pack(self.dictionary_id, len(dictionary)) + dictionary
+
+    def _read_dictionary_section(self, read):
+        dict_id, size = DICTIONARY_SECTION.unpack(read(DICTIONARY_SECTION.size))
+        if size:
+            dictionary = read(size)
+            if dictionary_id(dictionary) != dict_id:
+                raise ValueError("Diccionario embebido dañado")
+            self.dictionaries[dict_id] = dictionary
+        elif dict_id and dict_id not in self.dictionaries:
+            raise ValueError(f"Falta el diccionario externo {dict_id:08x}; regístralo con add_dictionary")
+
+    def _try_path(self, block: bytes, path: str, prepared: tuple):
+        """
+        Comprime por un camino concreto y devuelve la trama como lista de
+        partes (cabecera y payload, sin concatenar); None si no alcanza su umbral.
+        """
+        if path == 'none':
+            # Sin copia: el payload es el propio bloque (vista del mmap)
+            return self._codec_frame(get_codec('store'), 0, block)
+
+        # Etapas de codec: directa (DualQuantum) o agresiva (GalacticShard)
+        _, codec_name, level, threshold = self.compression_stages[path]
+        codec = get_codec(codec_name)
+        choice, payload = prepared
+        if choice is None and codec.name == 'zlib' and self.dictionary_id:
+            compressed = self._compress_with_dictionary(payload, level)
+            if len(compressed) >= len(block) * threshold:
+                return None
+            return [bytes((BLOCK_DICTIONARY, level)) + struct.pack('<I', self.dictionary_id), compressed]
+
+        compressed = codec.compress(payload, level)
+        if len(compressed) >= len(block) * threshold:
+            return None
+        if choice is None:
+            return self._codec_frame(codec, level, compressed)
+        return [bytes((BLOCK_FILTERED, choice[0], choice[1], codec.codec_id, level)), compressed]
+
+    def _compress_cascade(self, block: bytes, prepared: tuple, first: int = 0) -> tuple:
+        """Prueba los caminos en orden desde ``first`` hasta que uno cumple su umbral."""
+        for path in self.compression_paths[first:]:
+            compressed = self._try_path(block, path, prepared)
+            if compressed is not None:
+                return compressed, path
+
+    def _compress_predicted(self, block: bytes, predicted: str, prepared: tuple) -> tuple:
+        """
+        Comprime por el camino predicho y lo verifica; si la predicción falla
+        se cuenta como error y se continúa la cascada desde el siguiente camino.
+        """
+        if predicted == 'none':
+            # Verificación barata: prueba de compresión sobre un prefijo
+            prefix = block[:self.classifier_sample_size]
+            if len(zlib.compress(prefix, level=1)) >= len(prefix) * 0.9:
+                return self._try_path(block, 'none', prepared), 'none'
+            self._count_decision('mispredictions')
+            return self._compress_cascade(block, prepared)
+
+        compressed = self._try_path(block, predicted, prepared)
+        if compressed is None:
+            self._count_decision('mispredictions')
+            return self._compress_cascade(block, prepared, self.compression_paths.index(predicted) + 1)
+
+        first_path = self.compression_paths[0]
+        if predicted != first_path and self._frame_size(compressed) < len(block) * self.compression_stages[first_path][3]:
+            # El bloque habría bastado con la primera etapa, más barata
+            self._count_decision('mispredictions')
+            return compressed, first_path
+        return compressed, predicted
+
+    def _compress_columnar(self, block: bytes):
+        """Trama columnar con el codec de la primera etapa del perfil, o None si no conviene."""
+        _, codec_name, level, _ = self.compression_stages[self.compression_paths[0]]
+        codec = get_codec(codec_name)
+        encoded = TblColumnar.encode(bytes(block), codec, level)
+        if encoded is None or len(encoded) >= len(block):
+            return None
+        return [bytes((BLOCK_COLUMNAR, codec.codec_id, level)), encoded]
 
     def _compress_block(self, block: bytes) -> tuple:
         """
         Compresión de bloque optimizada usando las cuatro partículas.
+        Devuelve (partes de la trama, metadata); el bloque puede ser cualquier
+        objeto con protocolo de buffer (bytes, memoryview de un mmap...).
+
+        Un clasificador de entropía agrupa bloques similares; el primer bloque
+        de cada grupo elige preacondicionador y recorre la cascada completa, y
+        los siguientes reutilizan ese filtro y van directamente al camino que
+        ganó, en lugar de comprimir hasta tres veces.
+        """
+        block_start = time.time()
+        
+        if not len(block):
+            return [], None
+
+        if self._columnar_active:
+            compressed = self._compress_columnar(block)
+            if compressed is not None:
+                self.metrics.observe('compress', 'columnar', time.time() - block_start)
+                return compressed, None
+
+        bucket = self._entropy_bucket(block)
+        decision = self._decision_cache.get(bucket)
+        if decision is None:
+            self._count_decision('probes')
+            choice = self.processor.choose_precondition(self._sample_block(block)) if self.precondition else None
+            self.metrics.observe('classify', 'probe', time.time() - block_start)
+            prepared = self._prepare_block(block, choice)
+            compress_start = time.time()
+            compressed, path = self._compress_cascade(block, prepared)
+        else:
+            self._count_decision('predictions')
+            predicted, choice = decision
+            self.metrics.observe('classify', 'prediction', time.time() - block_start)
+            prepared = self._prepare_block(block, choice)
+            compress_start = time.time()
+            compressed, path = self._compress_predicted(block, predicted, prepared)
+
+        self._decision_cache[bucket] = (path, choice)
+        if prepared[0] is not None and path != 'none':
+            with self._decision_lock:
+                self.performance_metrics['filter_usage'][PRECONDITIONERS[choice[0]][0]] += 1
+        self.metrics.observe('compress', path, time.time() - compress_start)
+        return compressed, None
+
+    def _decompress_block(self, data: bytes, metadata: dict) -> bytes:
+        """
+        Descompresión de bloque optimizada usando las cuatro partículas.
         """
         block_start = time.time()
         
-        if not block:
-            return b'', None
+        if not len(data):
+            return b''
             
-        # Compresión directa rápida primero (DualQuantum)
-        direct_compressed = zlib.compress(block, level=1)
-        if len(direct_compressed) < len(block) * 0.5:
-            self.performance_metrics['block_times'].append(('direct', time.time() - block_start))
-            return b'\x00' + direct_compressed, None
+        block_type = data[0]
+        content = data[1:]
         
-        # Compresión cuántica paralela con campo (QUANTUMFIELD + MaxFold + GalacticShard)
-        try:
-            data = np.frombuffer(block, dtype=np.uint8)
+        if block_type == BLOCK_CODEC:  # Codec registrado
+            codec = get_codec(data[1])
+            result = codec.decompress(data[3:])
+            self.metrics.observe('decompress', codec.name, time.time() - block_start)
+            return result
+
+        if block_type == BLOCK_DICTIONARY:  # zlib con diccionario preestablecido
+            dict_id = struct.unpack_from('<I', data, 2)[0]
+            decompressor = zlib.decompressobj(zdict=self.dictionaries[dict_id])
+            result = decompressor.decompress(data[6:]) + decompressor.flush()
+            self.metrics.observe('decompress', 'dictionary', time.time() - block_start)
+            return result
+
+        if block_type == BLOCK_REFERENCE:
+            raise ValueError("Bloque de referencia: se resuelve a través del índice de bloques")
+
+        if block_type == BLOCK_COLUMNAR:  # Columnas .tbl
+            columns, ends_with_newline = TblColumnar.decode(data[3:], get_codec(data[1]))
+            result = TblColumnar.join_rows(columns, ends_with_newline)
+            self.metrics.observe('decompress', 'columnar', time.time() - block_start)
+            return result
+
+        if block_type == BLOCK_FILTERED:  # Preacondicionado + codec
+            filter_id, param, codec_id = data[1], data[2], data[3]
             Doek_start = time.time()
-            transformed = self.processor.Doek_transform(data)
-            Doek_time = time.time() - Doek_start
-            self.performance_metrics['cpu_usage'].append(Doek_time)
+            decompressed = np.frombuffer(get_codec(codec_id).decompress(data[5:]), dtype=np.uint8)
+            result = self.processor.restore(decompressed, filter_id, param, 'restore')
+            self.metrics.observe('transform', PRECONDITIONERS[filter_id][0], time.time() - Doek_start)
+            self.metrics.observe('decompress', 'filtered', time.time() - block_start)
+            return result.tobytes()
+
+        if block_type == 0:  # Directa (DualQuantum)
+            result = get_codec(LEGACY_BLOCK_CODECS[block_type]).decompress(content)
+            self.metrics.observe('decompress', 'direct', time.time() - block_start)
+            return result
             
-            # Medición de la fuerza del campo
-            field_strength = np.mean(np.abs(transformed - data))
-            self.performance_metrics['field_strength'].append(field_strength)
+        if block_type == 1:  # Doek v12 (QUANTUMFIELD + MaxFold + GalacticShard), solo lectura
+            decompressed = zlib.decompress(content)
+            Doek_data = np.frombuffer(decompressed, dtype=np.uint8)
+            Doek_start = time.time()
+            result = self.processor.inverse_transform(Doek_data, out=self.processor.scratch('restore', len(Doek_data)))
+            Doek_time = time.time() - Doek_start
+            self.metrics.observe('transform', 'Doek', Doek_time)
+            self.metrics.observe('decompress', 'Doek', time.time() - block_start)
+            return result.tobytes()
             
-            compressed = zlib.compress(transformed.tobytes(), level=6)
-            if len(compressed) < len(block) * 0.7:
-                self.performance_metrics['block_times'].append(('Doek', time.time() - block_start))
-                return b'\x01' + compressed, None
-                
-        except Exception as e:
-            print(f"Error en transformación cuántica: {str(e)}")
-        
-        # Compresión agresiva como último recurso (GalacticShard)
-        aggressive = zlib.compress(block, level=9)
-        if len(aggressive) < len(block):
-            self.performance_metrics['block_times'].append(('aggressive', time.time() - block_start))
-            return b'\x02' + aggressive, None
+        if block_type == 2:  # Agresiva (GalacticShard)
+            result = get_codec(LEGACY_BLOCK_CODECS[block_type]).decompress(content)
+            self.metrics.observe('decompress', 'aggressive', time.time() - block_start)
+            return result
             
-        self.performance_metrics['block_times'].append(('none', time.time() - block_start))
-        return b'\x03' + block, None
+        if block_type == 3:  # Sin comprimir (v12)
+            self.metrics.observe('decompress', 'none', time.time() - block_start)
+            return bytes(content)
+
+        raise ValueError(f"Tipo de bloque desconocido: {block_type}")
+
+    def _decode_metadata(self, meta_data: bytes):
+        """
+        Metadata de una trama: (tamaño original, CRC32 del payload, CRC32 del
+        original) en v15, None en tramas sin metadata (v12-v14). Si lleva
+        resumen por columnas, se valida su CRC32.
+        """
+        if not meta_data:
+            return None
+        if len(meta_data) < FRAME_META.size:
+            raise ValueError(f"Metadata de bloque inválida ({len(meta_data)} bytes)")
+        if len(meta_data) > FRAME_META.size:
+            BlockStats.check(meta_data[FRAME_META.size:])
+        return FRAME_META.unpack_from(meta_data)
+
+    def _split_frame(self, frame) -> tuple:
+        """
+        Separa una trama en (payload, metadata) y comprueba el CRC32 del
+        payload antes de descomprimir nada.
+        """
+        header_size = struct.calcsize('II')
+        if len(frame) < header_size:
+            raise ValueError("Trama truncada")
+        block_size, meta_size = struct.unpack_from('II', frame)
+        if header_size + block_size + meta_size != len(frame):
+            raise ValueError("Trama truncada o con tamaños inconsistentes")
+        payload = frame[header_size:header_size + block_size]
+        metadata = self._decode_metadata(frame[header_size + block_size:])
+        if metadata is not None and zlib.crc32(payload) != metadata[1]:
+            raise ValueError("Checksum incorrecto en los datos comprimidos del bloque")
+        return payload, metadata
+
+    def _decode_frame(self, frame: bytes) -> bytes:
+        """
+        Descomprime una trama completa (cabecera 'II' + bloque + metadata) y,
+        en v15, verifica tamaño y CRC32 del resultado.
+        """
+        return self._decode_payload(*self._split_frame(frame))
+
+    def _decode_payload(self, payload, metadata) -> bytes:
+        decompressed = self._decompress_block(payload, metadata)
+        if metadata is not None and (len(decompressed) != metadata[0] or zlib.crc32(decompressed) != metadata[2]):
+            raise ValueError("Checksum incorrecto en los datos descomprimidos del bloque")
+        return decompressed
+
+    def _read_header(self, read, f=None) -> tuple:
+        """
+        Valida la cabecera leída con ``read(n)`` y devuelve (versión, tamaño
+        original); en el formato de flujo el tamaño es None. Registra el
+        diccionario embebido si lo hay. Con el archivo ``f`` abierto, el
+        tamaño de un archivo indexado de un solo miembro se toma del índice,
+        que ``append`` confirma con el trailer, y no de la cabecera.
+        """
+        if read(4) != self.magic_number:
+            raise ValueError("Formato de archivo inválido")
+
+        version = struct.unpack('B', read(1))[0]
+        base_version = version & ~(STREAM_FLAG | ARCHIVE_FLAG)
+        if base_version not in self.indexed_versions and version not in self.legacy_versions:
+            raise ValueError(f"Versión incompatible: {version}")
+
+        # En el formato de flujo el tamaño va al final
+        original_size = None if version & STREAM_FLAG else struct.unpack('Q', read(8))[0]
+        if base_version >= 14:
+            self._read_dictionary_section(read)
+        if f is not None and base_version in self.indexed_versions and not version & (STREAM_FLAG | ARCHIVE_FLAG):
+            position = f.tell()
+            original_size = self._indexed_size(f)
+            f.seek(position)
+        return version, original_size
+
+    def _indexed_size(self, f) -> int:
+        """Tamaño original según la última entrada del índice (0 si está vacío)."""
+        index_offset, block_count, magic = INDEX_TRAILER.unpack(self._read_tail(f, INDEX_TRAILER.size))
+        if magic != INDEX_MAGIC:
+            raise ValueError("Índice de bloques dañado o ausente")
+        if not block_count:
+            return 0
+        f.seek(index_offset + (block_count - 1) * BLOCK_INDEX_DTYPE.itemsize)
+        last = np.frombuffer(f.read(BLOCK_INDEX_DTYPE.itemsize), dtype=BLOCK_INDEX_DTYPE)[0]
+        return int(last['raw_offset'] + last['raw_len'])
+
+    def _require_index(self, version: int):
+        if version in self.legacy_versions or version & STREAM_FLAG:
+            raise ValueError(f"La versión {version} no tiene índice de bloques; recomprime el archivo")
+
+    def _read_index(self, f) -> np.ndarray:
+        """Lee el índice de bloques del final de un archivo v13."""
+        f.seek(-INDEX_TRAILER.size, os.SEEK_END)
+        index_offset, block_count, magic = INDEX_TRAILER.unpack(f.read(INDEX_TRAILER.size))
+        if magic != INDEX_MAGIC:
+            raise ValueError("Índice de bloques dañado o ausente")
+
+        f.seek(index_offset)
+        raw = f.read(block_count * BLOCK_INDEX_DTYPE.itemsize)
+        return np.frombuffer(raw, dtype=BLOCK_INDEX_DTYPE)
+
+    @staticmethod
+    def _pwrite(fd: int, data: bytes, offset: int, lock: threading.Lock):
+        """Escritura posicional; en plataformas sin ``os.pwrite`` usa seek bajo lock."""
+        if hasattr(os, 'pwrite'):
+            while data:
+                written = os.pwrite(fd, data, offset)
+                data = data[written:]
+                offset += written
+            return
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while data:
+                data = data[os.write(fd, data):]
+
+    @staticmethod
+    def _writev(fd: int, parts: list):
+        """Escritura con scatter I/O (``os.writev``) de las partes de una trama, sin concatenarlas."""
+        parts = [memoryview(part) for part in parts if len(part)]
+        if not hasattr(os, 'writev'):
+            for part in parts:
+                while part:
+                    part = part[os.write(fd, part):]
+            return
+        while parts:
+            written = os.writev(fd, parts)
+            while parts and written >= len(parts[0]):
+                written -= len(parts.pop(0))
+            if parts and written:
+                parts[0] = parts[0][written:]
+
+    @contextlib.contextmanager
+    def _mapped(self, f):
+        """Mapea en solo lectura un archivo abierto; produce None si está vacío."""
+        if os.fstat(f.fileno()).st_size == 0:
+            yield None
+            return
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapping
+        finally:
+            try:
+                mapping.close()
+            except BufferError:
+                pass  # Aún hay vistas vivas; el mapeo se libera con la última
+
+    @staticmethod
+    def _release_pages(mapping, start: int, end: int) -> int:
+        """
+        Devuelve al sistema las páginas ya procesadas del mapeo (hasta ``end``)
+        para que el RSS no crezca con el tamaño del archivo. Devuelve el nuevo
+        inicio de la zona aún mapeada.
+        """
+        end -= end % mmap.PAGESIZE
+        if mapping is None or end <= start or not hasattr(mmap, 'MADV_DONTNEED'):
+            return start
+        mapping.madvise(mmap.MADV_DONTNEED, start, end - start)
+        return end
+
+    def _read_frames(self, f, entries, mapping=None):
+        """
+        Etapa lectora del descompresor: produce (entrada, trama) en orden de
+        índice. Con ``mapping`` las tramas son vistas del mmap, sin copias.
+        """
+        if mapping is not None:
+            frames = memoryview(mapping)
+            for entry in entries:
+                offset = int(entry['comp_offset'])
+                yield entry, frames[offset:offset + int(entry['comp_len'])]
+            return
+        for entry in entries:
+            f.seek(int(entry['comp_offset']))
+            yield entry, f.read(int(entry['comp_len']))
+
+    def _map_blocks(self, mapping, align_rows: bool = False, start: int = 0):
+        """
+        Etapa lectora sin copias: vistas de ``block_size`` bytes sobre el mmap
+        a partir de ``start``. Con ``align_rows`` cada vista termina en un
+        salto de línea.
+        """
+        view = memoryview(mapping)
+        size = len(view)
+        while start < size:
+            end = min(start + self.block_size, size)
+            if align_rows and end < size:
+                cut = mapping.rfind(b'\n', start, end) + 1
+                if cut <= start:
+                    limit = min(start + 2 * self.block_size, size)
+                    cut = mapping.find(b'\n', end, limit) + 1 or limit
+                end = cut
+            yield view[start:end]
+            start = end
+
+    def _read_blocks(self, f):
+        """Etapa lectora: produce bloques de ``block_size`` hasta agotar el archivo."""
+        while True:
+            block = f.read(self.block_size)
+            if not block:
+                break
+            yield block
+
+    def _align_rows(self, blocks):
+        """
+        Corta los bloques en el último salto de línea para que el modo
+        columnar vea solo filas completas; el resto pasa al bloque siguiente.
+        """
+        carry = b''
+        for block in blocks:
+            data = carry + block
+            cut = data.rfind(b'\n') + 1
+            if cut == 0 and len(data) < 2 * self.block_size:
+                carry = data
+                continue
+            cut = cut or len(data)
+            carry = data[cut:]
+            yield data[:cut]
+        if carry:
+            yield carry
+
+    def _cdc_candidates(self, data: np.ndarray, mask_bits: int) -> np.ndarray:
+        """
+        Posiciones de corte del hash Gear. Solo los ``mask_bits`` bits bajos
+        deciden el corte, y esos dependen de los últimos ``mask_bits`` bytes,
+        así que el hash se calcula vectorizado con un desplazamiento por bit.
+        """
+        gear = GEAR_TABLE[data]
+        rolling = np.zeros(len(data), dtype=np.uint32)
+        for shift in range(min(mask_bits, len(data))):
+            rolling[shift:] += gear[:len(data) - shift] << np.uint32(shift)
+        mask = np.uint32((1 << mask_bits) - 1)
+        return np.flatnonzero((rolling & mask) == 0) + 1
+
+    def _cdc_chunks(self, data):
+        """
+        Troceado por contenido de un buffer (normalmente la vista del mmap):
+        fragmentos de ``block_size / 16`` a ``block_size`` bytes, con cortes
+        que siguen al contenido y no al offset. El hash de cada fragmento se
+        calcula desde su propio inicio, así que los cortes solo dependen del
+        contenido y se produce una vista por fragmento, sin copias.
+        """
+        min_size = max(1, self.block_size // 16)
+        max_size = self.block_size
+        mask_bits = max(1, max_size.bit_length() - 3)  # Media cercana a block_size / 4
+        view = memoryview(data)
+        start = 0
+        while start < len(view):
+            window = np.frombuffer(view[start:start + max_size], dtype=np.uint8)
+            cut = len(window)
+            if cut > min_size:
+                candidates = self._cdc_candidates(window, mask_bits)
+                i = int(np.searchsorted(candidates, min_size))
+                if i < len(candidates):
+                    cut = int(candidates[i])
+            yield view[start:start + cut]
+            start += cut
+
+    def _dedup_chunks(self, chunks, first: int = 0):
+        """
+        Etapa de deduplicación (en orden, antes del pool): produce
+        ``(fragmento, bloque original o None)``. El índice hash -> nº de bloque
+        está acotado a ``dedup_index_size`` entradas con expulsión LRU o FIFO.
+        Los bloques se numeran desde ``first``.
+        """
+        index = OrderedDict()
+        stats = self.performance_metrics['dedup']
+        for number, chunk in enumerate(chunks, first):
+            stats['chunks'] += 1
+            digest = hashlib.blake2b(chunk, digest_size=16).digest()
+            original = index.get(digest)
+            if original is not None:
+                stats['hits'] += 1
+                stats['bytes_saved'] += len(chunk)
+                if self.dedup_eviction == 'lru':
+                    index.move_to_end(digest)
+                yield chunk, original
+                continue
+            index[digest] = number
+            if len(index) > self.dedup_index_size:
+                index.popitem(last=False)
+                stats['evictions'] += 1
+            yield chunk, None
+
+    def _timed_items(self, items, operation: str):
+        """Recorre ``items`` registrando el tiempo de la etapa lectora."""
+        items = iter(items)
+        while True:
+            read_start = time.time()
+            item = next(items, None)
+            if item is None:
+                return
+            self.metrics.observe('read', operation, time.time() - read_start)
+            yield item
+
+    def _progress(self, operation: str, done: int, total: int, blocks: int, output_size: int = 0):
+        """Publica un evento de progreso a los hooks registrados (``total`` None: desconocido)."""
+        if self.metrics.hooks:
+            self.metrics.emit({'event': 'progress', 'operation': operation, 'done': done,
+                               'total': total, 'blocks': blocks, 'output_size': output_size})
+
+    def _pipeline(self, func, items, operation: str = 'pipeline'):
+        """
+        Aplica ``func`` a cada elemento en paralelo (DualQuantum) y entrega los
+        resultados en el orden de entrada.
+
+        Como mucho ``max_inflight`` elementos están en vuelo a la vez, de modo
+        que la etapa lectora nunca se adelanta más de esa ventana a la escritora.
+        zlib libera el GIL, por lo que un pool de hilos basta para escalar con
+        los núcleos sin copiar bloques entre procesos.
+        """
+        items = self._timed_items(items, operation)
+        if self.workers == 1:
+            for item in items:
+                yield func(item)
+            return
+
+        executor = self._get_executor()
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                self.metrics.gauge('queue_depth', len(pending))
+                if len(pending) >= self.max_inflight:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Consumidor que abandona o error: no dejamos trabajo huérfano en el
+            # pool, y esperamos a las tareas ya en marcha, que pueden estar
+            # leyendo vistas del mmap que el llamador va a cerrar
+            running = [future for future in pending if not future.cancel()]
+            wait(running)
+
+    def _frame_writer(self, out):
+        """Función ``write(partes)`` sobre ``out``: ``writev`` sin copias o ``write`` clásico."""
+        fd = out.fileno()
+
+        def write(parts):
+            write_start = time.time()
+            if self.zero_copy:
+                self._writev(fd, parts)
+            else:
+                out.write(b''.join(parts))
+            self.metrics.observe('write', 'compress', time.time() - write_start)
+
+        return write
+
+    def _chunk_source(self, f, mapping, start: int = 0):
+        """
+        Etapa lectora de un archivo abierto desde ``start``: fragmentos por
+        contenido con ``dedup``, vistas del mmap sin copias o bloques leídos
+        con ``read``.
+        """
+        # Solo los bloques cortados por filas llevan resumen por columnas
+        self._stats_active = self.stats and self._columnar_active and not self.dedup
+        if mapping is None:  # Archivo vacío
+            return iter(())
+        if self.dedup:
+            return self._cdc_chunks(memoryview(mapping)[start:])
+        if self.zero_copy:
+            return self._map_blocks(mapping, self._columnar_active, start)
+        f.seek(start)
+        blocks = self._read_blocks(f)
+        return self._align_rows(blocks) if self._columnar_active else blocks
 
-    def _decompress_block(self, data: bytes, metadata: dict) -> bytes:
+    def _write_frames(self, write, items, compressed_size: int, total_size: int,
+                      mapping=None, on_block=None, index=None, raw_offset: int = 0,
+                      mapping_base: int = 0) -> tuple:
         """
-        Descompresión de bloque optimizada usando las cuatro partículas.
+        Lector -> pool de compresión -> escritor ordenado. ``items`` produce
+        (bloque, original), con ``original`` = nº de bloque del que es
+        duplicado o None. Escribe las tramas a partir de ``compressed_size``
+        y devuelve (índice, tamaño comprimido acumulado). ``on_block(bloque)``
+        se llama en orden tras escribir cada bloque. ``index`` y
+        ``raw_offset`` permiten continuar un archivo existente (``append``);
+        ``mapping_base`` es el offset original que corresponde al inicio de
+        ``mapping``.
         """
-        block_start = time.time()
-        
-        if not data:
-            return b''
-            
-        block_type = data[0]
-        content = data[1:]
-        
-        try:
-            if block_type == 0:  # Directa (DualQuantum)
-                result = zlib.decompress(content)
-                self.performance_metrics['block_times'].append(('decomp_direct', time.time() - block_start))
-                return result
-                
-            if block_type == 1:  # Doek (QUANTUMFIELD + MaxFold + GalacticShard)
-                decompressed = zlib.decompress(content)
-                Doek_data = np.frombuffer(decompressed, dtype=np.uint8)
-                Doek_start = time.time()
-                result = self.processor.inverse_transform(Doek_data)
-                Doek_time = time.time() - Doek_start
-                self.performance_metrics['cpu_usage'].append(Doek_time)
-                self.performance_metrics['block_times'].append(('decomp_Doek', time.time() - block_start))
-                return result.tobytes()
-                
-            if block_type == 2:  # Agresiva (GalacticShard)
-                result = zlib.decompress(content)
-                self.performance_metrics['block_times'].append(('decomp_aggressive', time.time() - block_start))
-                return result
-                
-            self.performance_metrics['block_times'].append(('decomp_none', time.time() - block_start))
-            return content
+        index = list(index) if index is not None else []
+        released = 0
+
+        def compress_one(item):
+            block, original = item
+            if original is not None:
+                reference = [bytes((BLOCK_REFERENCE,)) + struct.pack('<Q', original)]
+                return block, self._frame_parts(reference, block, stats=False), original
+            return block, self._frame_parts(self._compress_block(block)[0], block), None
+
+        for block, frame, original in self._pipeline(compress_one, items, 'compress'):
+            raw_len = len(block)
+            # Escribimos bloque: cabecera, partes y metadata en una sola llamada
+            write(frame)
             
-        except Exception as e:
-            print(f"Error decompressing block: {str(e)}")
-            return content
+            frame_len = self._frame_size(frame)
+            if original is None:
+                index.append((compressed_size, frame_len, raw_offset, raw_len))
+            else:
+                # Duplicado: el índice apunta a la trama original
+                index.append(index[original][:2] + (raw_offset, raw_len))
+            raw_offset += raw_len
+            compressed_size += frame_len
+            if on_block is not None:
+                on_block(block)
+            released = self._release_pages(mapping, released, raw_offset - mapping_base)
+            self.metrics.increment('bytes_in', 'compress', raw_len)
+            self.metrics.increment('bytes_out', 'compress', frame_len)
+            self.metrics.increment('blocks', 'compress')
+            self._progress('compress', raw_offset, total_size, len(index), compressed_size)
+        return index, compressed_size
 
     def compress(self, input_file: str, output_file: str = None) -> str:
         """Compresión optimizada con campo cuántico."""
         if output_file is None:
             output_file = input_file + self.extension
 
-        compression_start = time.time()
+        self._start_operation([input_file])
+        self.performance_metrics['tuning_time'] = 0
         try:
+            # El sondeo del autoajuste se mide aparte: no cuenta como tiempo de compresión
+            if self.autotune:
+                tuning_start = time.time()
+                self.tune(input_file)
+                self.performance_metrics['tuning_time'] = time.time() - tuning_start
+            compression_start = time.time()
             file_size = os.path.getsize(input_file)
             self.performance_metrics['total_size'] = file_size
             print(f"\nProcesando archivo: {input_file} ({file_size/1024/1024:.2f} MB)")
             
-            with open(input_file, 'rb') as f, open(output_file, 'wb') as out:
+            with open(input_file, 'rb') as f, self._mapped(f) as mapping, \
+                    open(output_file, 'wb', buffering=0 if self.zero_copy else -1) as out:
+                write = self._frame_writer(out)
+
                 # Header
-                out.write(self.magic_number)
-                out.write(struct.pack('B', self.version))
-                out.write(struct.pack('Q', file_size))
-                
+                header = [
+                    self.magic_number,
+                    struct.pack('B', self.version),
+                    struct.pack('Q', file_size),
+                    self._dictionary_section(),
+                ]
+                write(header)
+
+                chunks = self._chunk_source(f, mapping)
+                blocks = self._dedup_chunks(chunks) if self.dedup else ((chunk, None) for chunk in chunks)
+
                 # Procesamiento por bloques
-                total_blocks = (file_size + self.block_size - 1) // self.block_size
-                processed_blocks = 0
-                compressed_size = len(self.magic_number) + 1 + 8
-                
-                while True:
-                    block = f.read(self.block_size)
-                    if not block:
-                        break
-                        
-                    compressed_block, metadata = self._compress_block(block)
-                    
-                    # Guardamos metadata
-                    meta_data = str(metadata).encode() if metadata else b''
-                    
-                    # Escribimos bloque
-                    block_header = struct.pack('II', len(compressed_block), len(meta_data))
-                    out.write(block_header)
-                    out.write(compressed_block)
-                    if meta_data:
-                        out.write(meta_data)
-                    
-                    compressed_size += len(block_header) + len(compressed_block) + len(meta_data)
-                    processed_blocks += 1
-                    progress = (processed_blocks / total_blocks) * 100
-                    ratio = (compressed_size / (processed_blocks * self.block_size)) * 100
-                    print(f"\rComprimiendo: {progress:.1f}% - Ratio: {ratio:.1f}%", end='', flush=True)
+                index, compressed_size = self._write_frames(write, blocks, self._frame_size(header),
+                                                            file_size, mapping)
+                processed_blocks = len(index)
+
+                # Índice de bloques + trailer para acceso aleatorio
+                index_bytes = np.array(index, dtype=BLOCK_INDEX_DTYPE).tobytes()
+                write([index_bytes, INDEX_TRAILER.pack(compressed_size, len(index), INDEX_MAGIC)])
+                compressed_size += len(index_bytes) + INDEX_TRAILER.size
 
             self.performance_metrics['compression_time'] = time.time() - compression_start
             self.performance_metrics['blocks_processed'] = processed_blocks
@@ -300,6 +1924,275 @@ class DoekPlanetEngine:
             print(f"\nError durante la compresión: {str(e)}")
             return None
 
+    def _open_indexed(self, f) -> tuple:
+        """
+        Cabecera de un archivo indexado de un solo miembro, el único que
+        admite ``append``/``sync``: devuelve (versión, tamaño original, fin de
+        cabecera, id de diccionario).
+        """
+        version, original_size = self._read_header(f.read, f)
+        if version in self.legacy_versions or version & (STREAM_FLAG | ARCHIVE_FLAG):
+            raise ValueError(f"La versión {version} no admite actualización incremental; recomprime el archivo")
+        header_end = f.tell()
+        dictionary_id = 0
+        if version >= 14:
+            f.seek(len(self.magic_number) + 1 + 8)
+            dictionary_id = DICTIONARY_SECTION.unpack(f.read(DICTIONARY_SECTION.size))[0]
+        return version, original_size, header_end, dictionary_id
+
+    @contextlib.contextmanager
+    def _archive_dictionary(self, dictionary_id: int):
+        """Los bloques nuevos usan el diccionario de la cabecera existente, no el del motor."""
+        saved = self.dictionary_id
+        self.dictionary_id = dictionary_id or None
+        try:
+            yield
+        finally:
+            self.dictionary_id = saved
+
+    def append(self, archive: str, data) -> str:
+        """
+        Añade datos al final de un ``.doek`` indexado sin recomprimir lo
+        existente. ``data`` es una ruta o un objeto bytes. Las tramas nuevas
+        ocupan el lugar del índice antiguo, seguidas del índice y el trailer
+        nuevos; si algo falla, se restauran el índice y el trailer originales.
+        """
+        append_start = time.time()
+        if isinstance(data, str):
+            name = data
+        else:
+            name = archive[:-len(self.extension)] if archive.endswith(self.extension) else archive
+        self._start_operation([name])
+        try:
+            with contextlib.ExitStack() as stack:
+                if isinstance(data, str):
+                    print(f"\nAñadiendo {data} a {archive}")
+                    source = stack.enter_context(open(data, 'rb'))
+                    mapping = stack.enter_context(self._mapped(source))
+                    releasable = mapping
+                else:
+                    mapping = bytes(data) if isinstance(data, memoryview) else data
+                    mapping = mapping or None
+                    source = io.BytesIO(mapping or b'')
+                    releasable = None
+                added = self._append_blocks(archive, self._chunk_source(source, mapping),
+                                            len(mapping) if mapping else 0, releasable)
+
+            self.performance_metrics['compression_time'] = time.time() - append_start
+            speed = added / (1024 * 1024 * self.performance_metrics['compression_time'])
+            print(f"\nAñadidos {added/1024/1024:.2f} MB en {self.performance_metrics['compression_time']:.2f} segundos ({speed:.2f} MB/s)")
+            return archive
+
+        except Exception as e:
+            print(f"\nError al añadir: {str(e)}")
+            return None
+
+    def _append_blocks(self, archive: str, chunks, added_size: int, mapping=None, whole_source: bool = False) -> int:
+        """
+        Escribe ``chunks`` como bloques nuevos al final de ``archive`` y
+        devuelve los bytes añadidos. ``mapping`` contiene solo lo añadido o,
+        con ``whole_source``, el origen completo (``sync``).
+
+        Las tramas nuevas ocupan el lugar del índice antiguo, seguidas del
+        índice y el trailer nuevos: el trailer es el punto de confirmación,
+        porque el tamaño original de un archivo indexado se toma del índice.
+        Si algo falla antes, se restauran el índice y el trailer originales.
+        """
+        with open(archive, 'r+b', buffering=0 if self.zero_copy else -1) as out:
+            _, original_size, _, dictionary_id = self._open_indexed(out)
+            entries = self._read_index(out)
+            index_offset = INDEX_TRAILER.unpack(self._read_tail(out, INDEX_TRAILER.size))[0]
+            old_end = out.seek(0, os.SEEK_END)
+            out.seek(index_offset)
+            old_tail = out.read(old_end - index_offset)
+
+            out.seek(index_offset)
+            write = self._frame_writer(out)
+            try:
+                with self._archive_dictionary(dictionary_id):
+                    blocks = self._dedup_chunks(chunks, len(entries)) if self.dedup else ((chunk, None) for chunk in chunks)
+                    index, compressed_size = self._write_frames(write, blocks, index_offset,
+                                                                original_size + added_size, mapping,
+                                                                index=entries.tolist(), raw_offset=original_size,
+                                                                mapping_base=0 if whole_source else original_size)
+                if len(index) == len(entries):  # Nada que añadir
+                    return 0
+                total_size = int(index[-1][2] + index[-1][3])
+                index_bytes = np.array(index, dtype=BLOCK_INDEX_DTYPE).tobytes()
+                write([index_bytes, INDEX_TRAILER.pack(compressed_size, len(index), INDEX_MAGIC)])
+                out.flush()
+                os.fsync(out.fileno())
+            except BaseException:
+                # El archivo vuelve a ser el de antes: índice y trailer originales
+                out.seek(index_offset)
+                out.write(old_tail)
+                out.truncate(old_end)
+                raise
+
+            # El tamaño de la cabecera es solo informativo una vez escrito el trailer
+            out.seek(len(self.magic_number) + 1)
+            out.write(struct.pack('Q', total_size))
+
+        # Métricas solo de lo añadido: bytes originales nuevos frente a sus tramas
+        self.performance_metrics['total_size'] = total_size - original_size
+        self.performance_metrics['blocks_processed'] = len(index) - len(entries)
+        self.performance_metrics['compressed_size'] = compressed_size - index_offset
+        return total_size - original_size
+
+    @staticmethod
+    def _read_tail(f, size: int) -> bytes:
+        f.seek(-size, os.SEEK_END)
+        return f.read(size)
+
+    def _changed_blocks(self, f, entries, source, archive_mapping=None) -> list:
+        """
+        Compara cada bloque del archivo con el mismo rango de ``source`` y
+        devuelve una lista de booleanos (True = cambió o quedó truncado). Con
+        tramas v15 basta el CRC32 guardado; las anteriores se descomprimen.
+        """
+        source_size = len(source)
+
+        def compare(item):
+            entry, frame = item
+            start = int(entry['raw_offset'])
+            end = start + int(entry['raw_len'])
+            if end > source_size:
+                return True
+            payload, metadata = self._split_frame(frame)
+            if metadata is not None:
+                return zlib.crc32(source[start:end]) != metadata[2]
+            return self._decode_payload(payload, metadata) != source[start:end]
+
+        return list(self._pipeline(compare, self._read_frames(f, entries, archive_mapping), 'sync'))
+
+    def sync(self, source: str, archive: str) -> str:
+        """
+        Actualiza ``archive`` para que refleje el estado actual de ``source``
+        recomprimiendo solo los bloques que cambiaron. Si solo creció por el
+        final se añaden los bloques nuevos in situ (``append``); si no, el
+        archivo se reescribe en un temporal copiando tal cual las tramas sin
+        cambios y se sustituye de forma atómica con ``os.replace``.
+        """
+        sync_start = time.time()
+        self._start_operation([source])
+        try:
+            print(f"\nSincronizando {archive} con {source}")
+            with open(source, 'rb') as src, self._mapped(src) as mapping:
+                view = memoryview(mapping) if mapping is not None else memoryview(b'')
+                source_size = len(view)
+                with open(archive, 'rb') as f, self._mapped(f) as archive_mapping:
+                    _, original_size, _, _ = self._open_indexed(f)
+                    entries = self._read_index(f)
+                    kept = entries[entries['raw_offset'] < source_size]
+                    changed = self._changed_blocks(f, kept, view, archive_mapping if self.zero_copy else None)
+                    del view
+
+                if not any(changed) and source_size >= original_size:
+                    # Solo creció por el final: los bloques nuevos se añaden in situ
+                    if source_size > original_size:
+                        self._append_blocks(archive, self._chunk_source(src, mapping, original_size),
+                                            source_size - original_size, mapping, whole_source=True)
+                    rewritten = 0
+                else:
+                    rewritten = self._rewrite_changed(archive, kept, changed, src, mapping, source_size, original_size)
+
+            self.performance_metrics['sync'] = {'blocks': len(entries), 'changed': sum(changed),
+                                                'rewritten': rewritten}
+            self.performance_metrics['compression_time'] = time.time() - sync_start
+            print(f"\nSincronización completada en {self.performance_metrics['compression_time']:.2f} segundos "
+                  f"({sum(changed)} de {len(entries)} bloques cambiados)")
+            return archive
+
+        except Exception as e:
+            print(f"\nError durante la sincronización: {str(e)}")
+            return None
+
+    def _rewrite_changed(self, archive: str, entries, changed: list, src, mapping,
+                         source_size: int, original_size: int) -> int:
+        """
+        Reescribe ``archive`` en un temporal: tramas sin cambios copiadas del
+        original, bloques cambiados y cola nueva recomprimidos. Devuelve el
+        número de bloques recomprimidos.
+        """
+        temporary = archive + '.sync'
+        view = memoryview(mapping) if mapping is not None else memoryview(b'')
+        try:
+            with open(archive, 'rb') as f, self._mapped(f) as archive_mapping, \
+                    open(temporary, 'wb', buffering=0 if self.zero_copy else -1) as out:
+                _, _, header_end, dictionary_id = self._open_indexed(f)
+                f.seek(0)
+                header = bytearray(f.read(header_end))
+                struct.pack_into('Q', header, len(self.magic_number) + 1, source_size)
+                frames = memoryview(archive_mapping)
+
+                def items():
+                    # (tipo, trama de origen, bytes originales, datos): 'block' (bloque
+                    # cambiado) y 'tail' (cola nueva) se recomprimen, 'frame' se copia
+                    # y 'ref' reutiliza una trama ya copiada
+                    copied = set()
+                    for entry, block_changed in zip(entries, changed):
+                        start = int(entry['raw_offset'])
+                        end = min(start + int(entry['raw_len']), source_size)
+                        offset = int(entry['comp_offset'])
+                        if block_changed:
+                            yield 'block', None, end - start, view[start:end]
+                        elif offset in copied:
+                            yield 'ref', offset, end - start, None
+                        else:
+                            copied.add(offset)
+                            yield 'frame', offset, end - start, frames[offset:offset + int(entry['comp_len'])]
+                    if source_size > original_size:
+                        for chunk in self._chunk_source(src, mapping, original_size):
+                            yield 'tail', None, len(chunk), chunk
+
+                def encode(item):
+                    kind, offset, raw_len, data = item
+                    if kind in ('block', 'tail'):
+                        # Los bloques cambiados se recortan en los offsets antiguos, no por filas
+                        parts = self._compress_block(data)[0]
+                        return kind, offset, raw_len, self._frame_parts(parts, data, stats=kind == 'tail')
+                    return kind, offset, raw_len, [data] if kind == 'frame' else None
+
+                write = self._frame_writer(out)
+                write([header])
+                compressed_size = len(header)
+                raw_offset = 0
+                index = []
+                written = {}
+                rewritten = 0
+                with self._archive_dictionary(dictionary_id):
+                    for kind, offset, raw_len, frame in self._pipeline(encode, items(), 'compress'):
+                        if kind == 'ref':
+                            index.append(written[offset] + (raw_offset, raw_len))
+                        else:
+                            write(frame)
+                            frame_len = self._frame_size(frame)
+                            if kind == 'frame':
+                                written[offset] = (compressed_size, frame_len)
+                            else:
+                                rewritten += 1
+                                self.metrics.increment('bytes_in', 'compress', raw_len)
+                                self.metrics.increment('bytes_out', 'compress', frame_len)
+                                self.metrics.increment('blocks', 'compress')
+                            index.append((compressed_size, frame_len, raw_offset, raw_len))
+                            compressed_size += frame_len
+                        raw_offset += raw_len
+                        self._progress('compress', raw_offset, source_size, len(index), compressed_size)
+
+                index_bytes = np.array(index, dtype=BLOCK_INDEX_DTYPE).tobytes()
+                write([index_bytes, INDEX_TRAILER.pack(compressed_size, len(index), INDEX_MAGIC)])
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temporary, archive)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        self.performance_metrics['total_size'] = source_size
+        self.performance_metrics['blocks_processed'] = len(index)
+        self.performance_metrics['compressed_size'] = compressed_size + len(index_bytes) + INDEX_TRAILER.size
+        return rewritten
+
     def decompress(self, input_file: str, output_file: str = None) -> str:
         """Descompresión optimizada."""
         if not input_file.endswith(self.extension):
@@ -313,32 +2206,19 @@ class DoekPlanetEngine:
             print(f"\nLeyendo archivo comprimido: {input_file}")
             
             with open(input_file, 'rb') as f:
-                if f.read(4) != self.magic_number:
-                    raise ValueError("Formato de archivo inválido")
-                    
-                version = struct.unpack('B', f.read(1))[0]
-                if version != self.version:
-                    raise ValueError(f"Versión incompatible: {version}")
-
-                original_size = struct.unpack('Q', f.read(8))[0]
-                processed_size = 0
-                
-                with open(output_file, 'wb') as out:
-                    while processed_size < original_size:
-                        # Leemos tamaños
-                        block_size, meta_size = struct.unpack('II', f.read(8))
-                        
-                        # Leemos datos
-                        compressed_block = f.read(block_size)
-                        meta_data = eval(f.read(meta_size).decode()) if meta_size > 0 else None
-                        
-                        # Descomprimimos
-                        decompressed = self._decompress_block(compressed_block, meta_data)
-                        out.write(decompressed)
-                        
-                        processed_size += len(decompressed)
-                        progress = (processed_size / original_size) * 100
-                        print(f"\rDescomprimiendo: {progress:.1f}%", end='', flush=True)
+                version, original_size = self._read_header(f.read, f)
+
+                if version & STREAM_FLAG:
+                    f.seek(0)
+                    with open(output_file, 'wb') as out:
+                        original_size = self.decompress_stream(f, out)
+                elif version in self.legacy_versions:
+                    self._decompress_sequential(f, output_file, original_size)
+                elif version & ARCHIVE_FLAG:
+                    # Archivo multi-miembro: output_file es el directorio de destino
+                    self._extract_members(f, output_file, None, original_size)
+                else:
+                    self._decompress_indexed(f, output_file, original_size)
 
             self.performance_metrics['decompression_time'] = time.time() - decompression_start
             speed = original_size / (1024 * 1024 * self.performance_metrics['decompression_time'])
@@ -349,39 +2229,801 @@ class DoekPlanetEngine:
             print(f"\nError durante la descompresión: {str(e)}")
             return None
 
-    def get_detailed_metrics(self) -> dict:
-        """Obtiene métricas detalladas incluyendo uso de CPU y campo cuántico."""
-        metrics = self.performance_metrics.copy()
+    def _count_decompressed(self, frame_len: int, raw_len: int):
+        self.metrics.increment('bytes_in', 'decompress', frame_len)
+        self.metrics.increment('bytes_out', 'decompress', raw_len)
+        self.metrics.increment('blocks', 'decompress')
+
+    def _decompress_sequential(self, f, output_file: str, original_size: int):
+        """Descompresión de archivos sin índice (v12): recorre las tramas en orden."""
+        processed_size = 0
+        processed_blocks = 0
         
-        # Análisis de tiempos por tipo
-        block_types = defaultdict(list)
-        for btype, btime in metrics['block_times']:
-            block_types[btype].append(btime)
+        with open(output_file, 'wb') as out:
+            while processed_size < original_size:
+                # Leemos tamaños
+                block_size, meta_size = struct.unpack('II', f.read(8))
+                
+                # Leemos datos
+                compressed_block = f.read(block_size)
+                meta_data = self._decode_metadata(f.read(meta_size))
+                
+                # Descomprimimos
+                decompressed = self._decompress_block(compressed_block, meta_data)
+                write_start = time.time()
+                out.write(decompressed)
+                self.metrics.observe('write', 'decompress', time.time() - write_start)
+                
+                processed_size += len(decompressed)
+                processed_blocks += 1
+                self._count_decompressed(8 + block_size + meta_size, len(decompressed))
+                self._progress('decompress', processed_size, original_size, processed_blocks)
+
+    def _decompress_indexed(self, f, output_file: str, original_size: int):
+        """
+        Descompresión paralela guiada por el índice (v13): cada bloque se
+        descomprime en el pool y se escribe directamente en su offset.
+        """
+        entries = self._read_index(f)
+        write_lock = threading.Lock()
         
-        # Calculamos promedios
-        avg_times = {
-            btype: sum(times)/len(times)
-            for btype, times in block_types.items()
-        }
+        with self._mapped(f) as mapping, open(output_file, 'wb') as out:
+            out.truncate(original_size)
+            fd = out.fileno()
+            if not self.zero_copy:
+                mapping = None
+
+            def decompress_one(item):
+                entry, frame = item
+                decompressed = self._decode_frame(frame)
+                write_start = time.time()
+                self._pwrite(fd, decompressed, int(entry['raw_offset']), write_lock)
+                self.metrics.observe('write', 'decompress', time.time() - write_start)
+                self._count_decompressed(len(frame), len(decompressed))
+                return len(decompressed), int(entry['comp_offset'] + entry['comp_len'])
+
+            processed_size = 0
+            processed_blocks = 0
+            released = 0
+            frames = self._read_frames(f, entries, mapping)
+            for written, frame_end in self._pipeline(decompress_one, frames, 'decompress'):
+                released = self._release_pages(mapping, released, frame_end)
+                processed_size += written
+                processed_blocks += 1
+                self._progress('decompress', processed_size, original_size, processed_blocks)
+
+    def read_range(self, input_file: str, offset: int, length: int) -> bytes:
+        """
+        Devuelve ``length`` bytes del archivo original a partir de ``offset``,
+        descomprimiendo solo los bloques que se solapan con el rango.
+        """
+        if offset < 0 or length < 0:
+            raise ValueError("offset y length deben ser no negativos")
+
+        with open(input_file, 'rb') as f, self._mapped(f) as mapping:
+            version, original_size = self._read_header(f.read, f)
+            self._require_index(version)
+
+            end = min(offset + length, original_size)
+            if offset >= end:
+                return b''
+
+            entries = self._read_index(f)
+            starts = entries['raw_offset']
+            first = max(int(np.searchsorted(starts, offset, side='right')) - 1, 0)
+            last = int(np.searchsorted(starts, end, side='left'))
+            selected = entries[first:last]
+
+            frames = self._read_frames(f, selected, mapping if self.zero_copy else None)
+            decoded = self._pipeline(lambda item: self._decode_frame(item[1]), frames)
+            data = b''.join(decoded)
+
+        skip = offset - int(selected[0]['raw_offset'])
+        return data[skip:skip + (end - offset)]
+
+    def verify(self, archive: str, decode: bool = True) -> dict:
+        """
+        Comprueba la integridad de un ``.doek`` sin escribir nada: estructura
+        del índice y, en paralelo, el CRC32 de cada payload comprimido y, con
+        ``decode``, la descompresión y el CRC32 de cada bloque original. Las
+        tramas sin checksums (v13/v14) solo se comprueban descomprimiéndolas.
+        Devuelve un informe; ``report['ok']`` indica si el archivo está sano.
+        """
+        verify_start = time.time()
+        report = {'archive': archive, 'blocks': 0, 'bytes': 0, 'unchecked': 0, 'errors': []}
+        print(f"\nVerificando: {archive}")
+        try:
+            with open(archive, 'rb') as f, self._mapped(f) as mapping:
+                version, original_size = self._read_header(f.read, f)
+                if version in self.legacy_versions:
+                    raise ValueError(f"La versión {version} no tiene checksums ni índice; usa decompress")
+                if version & STREAM_FLAG:
+                    state = {}
+                    self._verify_frames(enumerate(self._read_stream_frames(f.read, state)), None, decode, report)
+                    if not report['errors'] and not report['unchecked'] \
+                            and report['bytes'] != state.get('original_size', report['bytes']):
+                        report['errors'].append((None, "El tamaño total no coincide con el trailer del flujo"))
+                else:
+                    self._verify_indexed(f, mapping if self.zero_copy else None, version, original_size,
+                                         decode, report)
+        except Exception as e:
+            report['errors'].append((None, str(e)))
+
+        report['ok'] = not report['errors']
+        report['time'] = time.time() - verify_start
+        speed = report['bytes'] / (1024 * 1024 * max(report['time'], 1e-9))
+        if report['ok']:
+            print(f"\nVerificación correcta: {report['blocks']} bloques, {report['bytes']/1024/1024:.2f} MB "
+                  f"en {report['time']:.2f} segundos ({speed:.2f} MB/s)")
+        else:
+            print(f"\nVerificación fallida: {len(report['errors'])} errores")
+            for block, error in report['errors'][:10]:
+                print(f"  {'archivo' if block is None else f'bloque {block}'}: {error}")
+        return report
+
+    def _verify_indexed(self, f, mapping, version: int, original_size: int, decode: bool, report: dict):
+        """Verificación de archivos indexados: estructura del índice y cada trama física una vez."""
+        entries = self._read_index(f)
+        index_offset = INDEX_TRAILER.unpack(self._read_tail(f, INDEX_TRAILER.size))[0]
+
+        raw_len = entries['raw_len'].astype(np.uint64)
+        expected = np.cumsum(raw_len, dtype=np.uint64) - raw_len
+        if not np.array_equal(entries['raw_offset'], expected) or int(raw_len.sum()) != original_size:
+            report['errors'].append((None, "Los offsets originales del índice no son contiguos o no suman el tamaño"))
+        if len(entries) and int((entries['comp_offset'] + entries['comp_len']).max()) > index_offset:
+            report['errors'].append((None, "El índice apunta fuera de la zona de tramas"))
+        if version & ARCHIVE_FLAG:
+            members = self._read_directory(f)
+            if sum(member['size'] for member in members) != original_size:
+                report['errors'].append((None, "El directorio central no coincide con el tamaño del archivo"))
+
+        # Los duplicados comparten trama: cada trama se comprueba una sola vez
+        _, first = np.unique(entries['comp_offset'], return_index=True)
+        numbers = np.sort(first)
+        frames = zip(numbers, self._read_frames(f, entries[numbers], mapping))
+        self._verify_frames(((int(number), frame) for number, (_, frame) in frames), entries, decode, report,
+                            original_size)
+
+    def _verify_frames(self, frames, entries, decode: bool, report: dict, total: int = None):
+        """
+        Comprueba en el pool las tramas ``(nº de bloque, trama)`` y acumula
+        en ``report`` los bloques, los bytes originales comprobados y los
+        errores. ``total`` es el tamaño original, None si no se conoce.
+        """
+        def check(item):
+            number, frame = item
+            try:
+                payload, metadata = self._split_frame(frame)
+                raw_len = metadata[0] if metadata is not None else None
+                if entries is not None and raw_len is not None and raw_len != int(entries[number]['raw_len']):
+                    raise ValueError("El tamaño del bloque no coincide con el índice")
+                if decode:
+                    raw_len = len(self._decode_payload(payload, metadata))
+                    if entries is not None and raw_len != int(entries[number]['raw_len']):
+                        raise ValueError("El tamaño descomprimido no coincide con el índice")
+                return number, len(frame), raw_len, None
+            except Exception as e:
+                return number, len(frame), None, str(e)
+
+        for number, frame_len, raw_len, error in self._pipeline(check, frames, 'verify'):
+            report['blocks'] += 1
+            if error is not None:
+                report['errors'].append((number, error))
+            elif raw_len is None:
+                report['unchecked'] += 1
+            else:
+                report['bytes'] += raw_len
+            self.metrics.increment('bytes_in', 'verify', frame_len)
+            self.metrics.increment('blocks', 'verify')
+            self._progress('verify', report['bytes'], total, report['blocks'])
+
+    def _rechunk(self, chunks):
+        """
+        Reagrupa trozos de tamaño arbitrario en bloques de ``block_size``. Los
+        bloques completos dentro de un trozo grande salen como vistas, sin copia.
+        """
+        buffer = bytearray()
+        for chunk in chunks:
+            view = memoryview(chunk)
+            if buffer:
+                needed = self.block_size - len(buffer)
+                buffer.extend(view[:needed])
+                view = view[needed:]
+                if len(buffer) < self.block_size:
+                    continue
+                yield bytes(buffer)
+                buffer = bytearray()
+            while len(view) >= self.block_size:
+                yield view[:self.block_size]
+                view = view[self.block_size:]
+            buffer.extend(view)
+        if buffer:
+            yield bytes(buffer)
+
+    def _read_pooled(self, reader, pool: BufferPool):
+        """Etapa lectora del flujo: llena buffers del pool con ``readinto``, sin bytes intermedios."""
+        while True:
+            buffer = pool.acquire()
+            view = memoryview(buffer)
+            filled = 0
+            while filled < len(view):
+                read = reader.readinto(view[filled:])
+                if not read:
+                    break
+                filled += read
+            if not filled:
+                pool.release(buffer)
+                return
+            yield view[:filled]
+            if filled < len(view):
+                return
+
+    @staticmethod
+    def _chunk_reader(chunks):
+        """Convierte un iterable de trozos en una función ``read(n)`` exacta."""
+        chunks = iter(chunks)
+        buffer = bytearray()
+
+        def read(n: int) -> bytes:
+            while len(buffer) < n:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                buffer.extend(chunk)
+            data = bytes(buffer[:n])
+            del buffer[:n]
+            return data
+
+        return read
+
+    def _read_stream_frames(self, read, state: dict):
+        """
+        Etapa lectora del flujo: produce tramas completas hasta el fin de flujo
+        y deja en ``state['original_size']`` el tamaño declarado en el trailer.
+        """
+        header_size = struct.calcsize('II')
+        while True:
+            header = read(header_size)
+            if len(header) < header_size:
+                raise ValueError("Flujo truncado: falta la marca de fin de flujo")
+            if header == END_OF_STREAM:
+                break
+            block_size, meta_size = struct.unpack('II', header)
+            body = read(block_size + meta_size)
+            if len(body) < block_size + meta_size:
+                raise ValueError("Flujo truncado dentro de un bloque")
+            yield header + body
+
+        trailer = read(STREAM_TRAILER.size)
+        if len(trailer) < STREAM_TRAILER.size:
+            raise ValueError("Flujo truncado: falta el tamaño original")
+        state['original_size'] = STREAM_TRAILER.unpack(trailer)[0]
+
+    def iter_compress(self, chunks, blocks=None, on_written=None):
+        """
+        Comprime un iterable de bytes y produce el flujo ``.doek`` por partes.
+
+        La memoria queda acotada a ``max_inflight * block_size`` sin importar
+        el tamaño total, por lo que sirve para tuberías y datos generados al vuelo.
+        Las partes pueden ser vistas de los bloques de entrada: hay que
+        consumirlas antes de pedir la siguiente. ``blocks`` sustituye al
+        reagrupado de ``chunks`` y ``on_written(bloque)`` se llama cuando la
+        trama de un bloque ya se produjo entera.
+        """
+        compression_start = time.time()
+        self._start_operation()
+        total_size = 0
+        header = self.magic_number + struct.pack('B', self.stream_version) + self._dictionary_section()
+        compressed_size = len(header)
+        processed_blocks = 0
+
+        yield header
+
+        def compress_one(block):
+            return block, self._frame_parts(self._compress_block(block)[0], block)
+
+        # Los bloques de ``blocks`` vienen de fuera y no se garantiza que estén cortados por filas
+        self._stats_active = self.stats and self._columnar_active and blocks is None
+        if blocks is None:
+            blocks = self._rechunk(chunks)
+            if self._columnar_active:
+                blocks = self._align_rows(blocks)
+
+        for block, frame in self._pipeline(compress_one, blocks, 'compress'):
+            yield from (part for part in frame if part)
+
+            frame_len = self._frame_size(frame)
+            total_size += len(block)
+            compressed_size += frame_len
+            processed_blocks += 1
+            self.metrics.increment('bytes_in', 'compress', len(block))
+            self.metrics.increment('bytes_out', 'compress', frame_len)
+            self.metrics.increment('blocks', 'compress')
+            if on_written is not None:
+                on_written(block)
+
+        yield END_OF_STREAM + STREAM_TRAILER.pack(total_size)
+        compressed_size += len(END_OF_STREAM) + STREAM_TRAILER.size
+
+        self.performance_metrics['compression_time'] = time.time() - compression_start
+        self.performance_metrics['blocks_processed'] = processed_blocks
+        self.performance_metrics['total_size'] = total_size
+        self.performance_metrics['compressed_size'] = compressed_size
+
+    def iter_decompress(self, chunks):
+        """Descomprime un flujo ``.doek`` recibido por partes y produce los bloques originales."""
+        decompression_start = time.time()
+        read = self._chunk_reader(chunks)
+
+        version, _ = self._read_header(read)
+        if not version & STREAM_FLAG:
+            raise ValueError(f"Versión de flujo incompatible: {version}")
+
+        state = {}
+        processed_size = 0
+        def decompress_one(frame):
+            decompressed = self._decode_frame(frame)
+            self._count_decompressed(len(frame), len(decompressed))
+            return decompressed
+
+        for decompressed in self._pipeline(decompress_one, self._read_stream_frames(read, state), 'decompress'):
+            processed_size += len(decompressed)
+            yield decompressed
+
+        if processed_size != state['original_size']:
+            raise ValueError(
+                f"Tamaño descomprimido inconsistente: {processed_size} != {state['original_size']}"
+            )
+        self.performance_metrics['decompression_time'] = time.time() - decompression_start
+
+    def compress_stream(self, reader, writer) -> int:
+        """
+        Comprime desde un objeto tipo archivo (``read``) hacia otro (``write``).
+        Devuelve el número de bytes originales procesados.
+        """
+        chunks = iter(lambda: reader.read(self.block_size), b'')
+        if not self.zero_copy or self.columnar or not hasattr(reader, 'readinto'):
+            parts = self.iter_compress(chunks)
+        else:
+            # Buffers reciclados: el escritor devuelve cada uno tras escribir su trama
+            pool = BufferPool(self.block_size, self.max_inflight + 1)
+            parts = self.iter_compress(chunks, blocks=self._read_pooled(reader, pool),
+                                       on_written=lambda block: pool.release(block.obj))
+        for part in parts:
+            write_start = time.time()
+            writer.write(part)
+            self.metrics.observe('write', 'stream', time.time() - write_start)
+        return self.performance_metrics['total_size']
+
+    def decompress_stream(self, reader, writer) -> int:
+        """
+        Descomprime desde un objeto tipo archivo hacia otro.
+        Devuelve el número de bytes originales escritos.
+        """
+        chunks = iter(lambda: reader.read(self.block_size), b'')
+        written = 0
+        for part in self.iter_decompress(chunks):
+            write_start = time.time()
+            writer.write(part)
+            self.metrics.observe('write', 'stream', time.time() - write_start)
+            written += len(part)
+        return written
+
+    def _decode_frame_columns(self, frame: bytes, columns) -> tuple:
+        """
+        Decodifica solo las columnas pedidas de una trama columnar y devuelve
+        ``('columns', columnas)``; otras tramas se descomprimen enteras como ``('raw', bytes)``.
+        """
+        data, metadata = self._split_frame(frame)
+        if data and data[0] == BLOCK_COLUMNAR:
+            decoded, _ = TblColumnar.decode(data[3:], get_codec(data[1]), columns)
+            return 'columns', decoded
+        return 'raw', self._decode_payload(data, metadata)
+
+    def iter_columns(self, input_file: str, columns: list):
+        """
+        Lectura proyectada: produce, fila a fila, una tupla con las columnas
+        pedidas (índices base 0) de un archivo ``.tbl`` comprimido. En los
+        bloques columnares solo se descomprimen esas columnas.
+        """
+        columns = list(columns)
+
+        def project(line: bytes) -> tuple:
+            fields = line.split(b'|')
+            return tuple(fields[column] for column in columns)
+
+        with open(input_file, 'rb') as f, self._mapped(f) as mapping:
+            version, _ = self._read_header(f.read)
+            self._require_index(version)
+            entries = self._read_index(f)
+
+            carry = b''
+            decode = lambda item: self._decode_frame_columns(item[1], columns)
+            frames = self._read_frames(f, entries, mapping if self.zero_copy else None)
+            for kind, decoded in self._pipeline(decode, frames):
+                if kind == 'columns':
+                    if carry:
+                        yield project(carry)
+                        carry = b''
+                    yield from zip(*decoded)
+                    continue
+                # Bloques no columnares: las filas pueden cruzar el borde del bloque
+                data = carry + decoded
+                cut = data.rfind(b'\n') + 1
+                carry = data[cut:]
+                for line in data[:cut].split(b'\n')[:-1]:
+                    yield project(line)
+            if carry:
+                yield project(carry)
+
+    def _frame_stats(self, f, mapping, offset: int):
+        """
+        Resumen por columnas de la trama en ``offset`` leyendo solo su
+        cabecera y su metadata; None si la trama no lo tiene.
+        """
+        def read(start: int, size: int):
+            if mapping is not None:
+                return mapping[start:start + size]
+            f.seek(start)
+            return f.read(size)
+
+        header_size = struct.calcsize('II')
+        block_size, meta_size = struct.unpack('II', read(offset, header_size))
+        if meta_size <= FRAME_META.size:
+            return None
+        return BlockStats.decode(read(offset + header_size + block_size + FRAME_META.size, meta_size - FRAME_META.size))
+
+    @staticmethod
+    def _filter_lines(data: bytes, column: int, predicate: tuple):
+        for line in data.split(b'\n'):
+            if line:
+                fields = line.split(b'|')
+                if column < len(fields) and BlockStats.matches(fields[column], predicate):
+                    yield tuple(fields)
+
+    def _scan_frame(self, frame, column: int, predicate: tuple, column_count: int) -> list:
+        """
+        Filas de un bloque de filas completas que cumplen el predicado. En
+        tramas columnares se decodifica primero solo la columna filtrada y el
+        resto únicamente si alguna fila cumple.
+        """
+        if column >= column_count:
+            return []
+        payload, metadata = self._split_frame(frame)
+        if not payload or payload[0] != BLOCK_COLUMNAR:
+            return list(self._filter_lines(self._decode_payload(payload, metadata), column, predicate))
+        codec = get_codec(payload[1])
+        (values,), _ = TblColumnar.decode(payload[3:], codec, [column])
+        hits = [i for i, value in enumerate(values) if BlockStats.matches(value, predicate)]
+        if not hits:
+            return []
+        columns, _ = TblColumnar.decode(payload[3:], codec)
+        return [tuple(values[i] for values in columns) for i in hits]
+
+    def scan(self, input_file: str, column: int, predicate):
+        """
+        Filtra filas de un ``.tbl`` comprimido sin descomprimirlo entero:
+        produce, en orden, las filas (tuplas de campos) cuya columna
+        ``column`` (base 0) cumple ``predicate`` (ver
+        ``BlockStats.parse_predicate``). Los bloques con resumen por columnas
+        (``stats=True`` al comprimir) que no pueden cumplirlo se saltan sin
+        leer su payload; el resto se descomprime en el pool. Los contadores
+        quedan en ``performance_metrics['scan']``.
+        """
+        predicate = BlockStats.parse_predicate(predicate)
+        counters = {'blocks': 0, 'skipped': 0, 'decoded': 0, 'rows': 0}
+        self.performance_metrics['scan'] = counters
+
+        with open(input_file, 'rb') as f, self._mapped(f) as mapping:
+            version, _ = self._read_header(f.read)
+            self._require_index(version)
+            entries = self._read_index(f)
+            mapping = mapping if self.zero_copy else None
+            summaries = {}
+
+            def candidates():
+                # Etapa lectora: decide con los resúmenes qué tramas hay que leer.
+                # Un bloque con resumen termina en fin de fila, pero solo empieza en
+                # inicio de fila si el anterior también lo tiene (o es el primero);
+                # si no, se trata como un bloque sin resumen.
+                aligned = True
+                for number, entry in enumerate(entries):
+                    counters['blocks'] += 1
+                    offset = int(entry['comp_offset'])
+                    if offset not in summaries:
+                        summaries[offset] = self._frame_stats(f, mapping, offset)
+                    summary = summaries[offset] if aligned else None
+                    aligned = summaries[offset] is not None
+                    if summary is not None:
+                        rows, columns = summary
+                        if column < len(columns) and not BlockStats.may_match(columns[column], rows, predicate):
+                            counters['skipped'] += 1
+                            yield None, None
+                            continue
+                    counters['decoded'] += 1
+                    _, frame = next(self._read_frames(f, entries[number:number + 1], mapping))
+                    yield frame, summary
+
+            def scan_one(item):
+                frame, summary = item
+                if frame is None:
+                    return 'skip', None
+                if summary is None:
+                    return 'raw', self._decode_frame(frame)
+                return 'rows', self._scan_frame(frame, column, predicate, len(summary[1]))
+
+            # Los bloques sin resumen pueden partir filas: se arrastra el resto
+            carry = b''
+            for kind, value in self._pipeline(scan_one, candidates(), 'scan'):
+                if kind == 'raw':
+                    data = carry + value
+                    cut = data.rfind(b'\n') + 1
+                    carry = data[cut:]
+                    value = list(self._filter_lines(data[:cut], column, predicate))
+                elif carry:
+                    yield from self._filter_lines(carry, column, predicate)
+                    carry = b''
+                if kind != 'skip':
+                    counters['rows'] += len(value)
+                    yield from value
+            if carry:
+                yield from self._filter_lines(carry, column, predicate)
+
+    @staticmethod
+    def _tree_members(directory: str, exclude: str = None) -> list:
+        """Rutas relativas (separador '/') de los archivos bajo ``directory``, en orden estable."""
+        names = []
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if os.path.isfile(path) and os.path.abspath(path) != exclude:
+                    names.append(os.path.relpath(path, directory).replace(os.sep, '/'))
+        return names
+
+    @staticmethod
+    def _member_path(output_dir: str, name: str) -> str:
+        """Ruta de extracción de un miembro; rechaza nombres que saldrían de ``output_dir``."""
+        parts = name.split('/')
+        if name.startswith('/') or any(part in ('', '.', '..') for part in parts):
+            raise ValueError(f"Nombre de miembro inseguro: {name}")
+        return os.path.join(output_dir, *parts)
+
+    def compress_tree(self, directory: str, archive: str = None) -> str:
+        """
+        Empaqueta los archivos de ``directory`` en un único ``.doek`` con
+        directorio central (nombre, tamaño, rango de bloques y checksum de cada
+        miembro). Los bloques de todos los miembros pasan por el mismo
+        pipeline, así que varios miembros se comprimen a la vez y cada archivo
+        pequeño no paga su propia cabecera. Con ``dedup`` los duplicados se
+        detectan también entre miembros.
+        """
+        if archive is None:
+            archive = directory.rstrip(os.sep) + self.extension
+
+        compression_start = time.time()
+        try:
+            names = self._tree_members(directory, os.path.abspath(archive))
+            # Un solo modo para todo el archivo: columnar si todos los miembros son .tbl
+            self._start_operation(names)
+            total_size = sum(os.path.getsize(os.path.join(directory, name)) for name in names)
+            print(f"\nEmpaquetando {len(names)} archivos de {directory} ({total_size/1024/1024:.2f} MB)")
+
+            members = [{'name': name, 'size': 0, 'blocks': 0, 'checksum': hashlib.blake2b(digest_size=16)}
+                       for name in names]
+            owners = deque()  # Miembro de cada fragmento, en el orden en que sale del lector
+
+            def member_chunks():
+                for number, member in enumerate(members):
+                    with open(os.path.join(directory, member['name']), 'rb') as f, self._mapped(f) as mapping:
+                        for chunk in self._chunk_source(f, mapping):
+                            owners.append(number)
+                            yield chunk
+
+            def on_block(block):
+                member = members[owners.popleft()]
+                member['size'] += len(block)
+                member['blocks'] += 1
+                member['checksum'].update(block)
+
+            with open(archive, 'wb', buffering=0 if self.zero_copy else -1) as out:
+                write = self._frame_writer(out)
+                header = [
+                    self.magic_number,
+                    struct.pack('B', self.version | ARCHIVE_FLAG),
+                    struct.pack('Q', total_size),
+                    self._dictionary_section(),
+                ]
+                write(header)
+
+                chunks = member_chunks()
+                blocks = self._dedup_chunks(chunks) if self.dedup else ((chunk, None) for chunk in chunks)
+                index, compressed_size = self._write_frames(write, blocks, self._frame_size(header),
+                                                            total_size, on_block=on_block)
+
+                # Índice, directorio central y trailers
+                index_bytes = np.array(index, dtype=BLOCK_INDEX_DTYPE).tobytes()
+                directory_offset = compressed_size + len(index_bytes)
+                entries = []
+                raw_offset = first_block = 0
+                for member in members:
+                    name = member['name'].encode('utf-8')
+                    entries.append(DIRECTORY_ENTRY.pack(len(name), member['size'], raw_offset, first_block,
+                                                        member['blocks'], member['checksum'].digest()) + name)
+                    raw_offset += member['size']
+                    first_block += member['blocks']
+                directory_bytes = b''.join(entries)
+                write([index_bytes, directory_bytes,
+                       DIRECTORY_TRAILER.pack(directory_offset, len(members), DIRECTORY_MAGIC),
+                       INDEX_TRAILER.pack(compressed_size, len(index), INDEX_MAGIC)])
+                compressed_size = (directory_offset + len(directory_bytes)
+                                   + DIRECTORY_TRAILER.size + INDEX_TRAILER.size)
+                if raw_offset != total_size:
+                    # Algún miembro cambió de tamaño mientras se leía: corregimos la cabecera
+                    out.seek(len(self.magic_number) + 1)
+                    out.write(struct.pack('Q', raw_offset))
+
+            self.performance_metrics['total_size'] = raw_offset
+            self.performance_metrics['compression_time'] = time.time() - compression_start
+            self.performance_metrics['blocks_processed'] = len(index)
+            self.performance_metrics['compressed_size'] = compressed_size
+
+            speed = raw_offset / (1024 * 1024 * self.performance_metrics['compression_time'])
+            print(f"\nEmpaquetado completado en {self.performance_metrics['compression_time']:.2f} segundos ({speed:.2f} MB/s)")
+            return archive
+
+        except Exception as e:
+            print(f"\nError durante el empaquetado: {str(e)}")
+            return None
+
+    def _read_directory(self, f) -> list:
+        """Lee el directorio central de un archivo multi-miembro."""
+        end = f.seek(-(INDEX_TRAILER.size + DIRECTORY_TRAILER.size), os.SEEK_END)
+        directory_offset, count, magic = DIRECTORY_TRAILER.unpack(f.read(DIRECTORY_TRAILER.size))
+        if magic != DIRECTORY_MAGIC:
+            raise ValueError("Directorio central dañado o ausente")
+
+        f.seek(directory_offset)
+        data = f.read(end - directory_offset)
+        members = []
+        position = 0
+        for _ in range(count):
+            name_len, size, raw_offset, first_block, blocks, checksum = DIRECTORY_ENTRY.unpack_from(data, position)
+            position += DIRECTORY_ENTRY.size
+            members.append({
+                'name': data[position:position + name_len].decode('utf-8'),
+                'size': size,
+                'raw_offset': raw_offset,
+                'first_block': first_block,
+                'blocks': blocks,
+                'checksum': checksum,
+            })
+            position += name_len
+        return members
+
+    def _open_archive(self, f) -> int:
+        """Valida la cabecera de un archivo multi-miembro y devuelve su tamaño original total."""
+        version, original_size = self._read_header(f.read)
+        if not version & ARCHIVE_FLAG or version & STREAM_FLAG:
+            raise ValueError("No es un archivo multi-miembro (usa compress_tree)")
+        return original_size
+
+    def list_members(self, archive: str) -> list:
+        """Miembros de un archivo multi-miembro según su directorio central, sin leer los datos."""
+        with open(archive, 'rb') as f:
+            self._open_archive(f)
+            members = self._read_directory(f)
+        for member in members:
+            member['checksum'] = member['checksum'].hex()
+        return members
+
+    def extract(self, archive: str, output_dir: str = None, members: list = None) -> str:
+        """
+        Extrae los miembros pedidos (todos si ``members`` es None) de un
+        archivo multi-miembro. Solo se leen las tramas de esos miembros, y cada
+        uno se verifica contra el checksum del directorio central.
+        """
+        if output_dir is None:
+            output_dir = archive[:-len(self.extension)] if archive.endswith(self.extension) else archive + '.d'
+
+        decompression_start = time.time()
+        try:
+            print(f"\nLeyendo archivo comprimido: {archive}")
+            with open(archive, 'rb') as f:
+                original_size = self._open_archive(f)
+                extracted = self._extract_members(f, output_dir, members, original_size)
+
+            self.performance_metrics['decompression_time'] = time.time() - decompression_start
+            speed = extracted / (1024 * 1024 * self.performance_metrics['decompression_time'])
+            print(f"\nExtracción completada en {self.performance_metrics['decompression_time']:.2f} segundos ({speed:.2f} MB/s)")
+            return output_dir
+
+        except Exception as e:
+            print(f"\nError durante la extracción: {str(e)}")
+            return None
+
+    def _extract_members(self, f, output_dir: str, names, original_size: int) -> int:
+        """
+        Extracción paralela: las tramas de los miembros elegidos se
+        descomprimen en el pool y el escritor las vuelca en orden, miembro a
+        miembro, verificando cada checksum. Devuelve los bytes extraídos.
+        """
+        directory = self._read_directory(f)
+        if names is None:
+            selected = directory
+        else:
+            by_name = {member['name']: member for member in directory}
+            missing = [name for name in names if name not in by_name]
+            if missing:
+                raise ValueError(f"Miembros no encontrados: {', '.join(missing)}")
+            selected = [by_name[name] for name in dict.fromkeys(names)]
+        total = sum(member['size'] for member in selected)
+        entries = self._read_index(f)
+
+        with self._mapped(f) as mapping:
+            mapping = mapping if self.zero_copy else None
+
+            def frames():
+                for member in selected:
+                    first = member['first_block']
+                    for _, frame in self._read_frames(f, entries[first:first + member['blocks']], mapping):
+                        yield frame
+
+            def decompress_one(frame):
+                decompressed = self._decode_frame(frame)
+                self._count_decompressed(len(frame), len(decompressed))
+                return decompressed
+
+            extracted = 0
+            with contextlib.closing(self._pipeline(decompress_one, frames(), 'decompress')) as results:
+                for number, member in enumerate(selected, 1):
+                    path = self._member_path(output_dir, member['name'])
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    checksum = hashlib.blake2b(digest_size=16)
+                    with open(path, 'wb') as out:
+                        for _ in range(member['blocks']):
+                            decompressed = next(results)
+                            checksum.update(decompressed)
+                            write_start = time.time()
+                            out.write(decompressed)
+                            self.metrics.observe('write', 'decompress', time.time() - write_start)
+                    if checksum.digest() != member['checksum']:
+                        raise ValueError(f"Checksum incorrecto en el miembro {member['name']}")
+                    extracted += member['size']
+                    self._progress('decompress', extracted, total, number)
+        return extracted
+
+    def get_detailed_metrics(self) -> dict:
+        """Obtiene métricas detalladas incluyendo uso de CPU, clasificador y deduplicación."""
+        metrics = self.performance_metrics.copy()
         
-        # Contamos uso de cada método
-        method_counts = defaultdict(int)
-        for btype, _ in metrics['block_times']:
-            method_counts[btype] += 1
+        # Tiempos medios y uso de cada método, a partir de los histogramas
+        # (los de descompresión con prefijo ``decomp_``)
+        block_types = dict(self.metrics.stage('compress'))
+        block_types.update({f'decomp_{label}': h for label, h in self.metrics.stage('decompress').items()})
+        avg_times = {btype: h.sum / h.count for btype, h in block_types.items()}
+        method_counts = {btype: h.count for btype, h in block_types.items()}
             
-        # Métricas CPU
+        # Métricas CPU (etapa de transformación)
+        transforms = self.metrics.stage('transform').values()
+        cpu_operations = sum(h.count for h in transforms)
         cpu_metrics = {
-            'total_cpu_time': sum(metrics['cpu_usage']),
-            'avg_cpu_time': sum(metrics['cpu_usage'])/len(metrics['cpu_usage']) if metrics['cpu_usage'] else 0,
-            'cpu_operations': len(metrics['cpu_usage'])
+            'total_cpu_time': sum(h.sum for h in transforms),
+            'avg_cpu_time': sum(h.sum for h in transforms) / cpu_operations if cpu_operations else 0,
+            'cpu_operations': cpu_operations
         }
         
-        # Métricas del campo cuántico
-        field_metrics = {
-            'avg_field_strength': sum(metrics['field_strength'])/len(metrics['field_strength']) if metrics['field_strength'] else 0,
-            'max_field_strength': max(metrics['field_strength']) if metrics['field_strength'] else 0,
-            'min_field_strength': min(metrics['field_strength']) if metrics['field_strength'] else 0
-        }
+        # Métricas del clasificador de bloques
+        classifier = metrics['classifier']
+        classifier_metrics = dict(classifier)
+        classifier_metrics['misprediction_rate'] = (
+            classifier['mispredictions'] / classifier['predictions'] if classifier['predictions'] else 0
+        )
+        
+        # Métricas de deduplicación
+        dedup = metrics['dedup']
+        dedup_metrics = dict(dedup)
+        dedup_metrics['hit_rate'] = dedup['hits'] / dedup['chunks'] if dedup['chunks'] else 0
             
         return {
             'compression_time': metrics['compression_time'],
@@ -392,18 +3034,178 @@ class DoekPlanetEngine:
             'blocks_processed': metrics['blocks_processed'],
             'compression_ratio': (metrics['compressed_size'] / metrics['total_size']) * 100,
             'average_times': avg_times,
-            'method_usage': dict(method_counts),
+            'method_usage': method_counts,
             'cpu_metrics': cpu_metrics,
-            'field_metrics': field_metrics
+            'classifier_metrics': classifier_metrics,
+            'filter_usage': dict(metrics['filter_usage']),
+            'dedup_metrics': dedup_metrics,
+            'stages': self.metrics.to_dict()['stages']
         }
 
+class AutoTuner:
+    """
+    Autoajuste del motor en esta máquina: mide velocidad y ratio sobre una
+    muestra de la entrada para cada cascada de ``TUNING_CASCADES``, luego
+    para cada tamaño de ``TUNING_BLOCK_SIZES`` y por último para el número
+    de hilos, y se queda con la combinación que cumple el objetivo. El
+    perfil se guarda por tipo de datos y objetivo en ``tuning_file``, así
+    que las siguientes ejecuciones no vuelven a medir.
+    """
+    def __init__(self, engine, target: dict, tuning_file: str = TUNING_FILE,
+                 sample_size: int = 4 * 1024 * 1024):
+        self.engine = engine
+        self.target = target
+        self.tuning_file = tuning_file
+        self.sample_size = sample_size
+
+    def sample(self, input_file: str) -> bytes:
+        """Hasta ``sample_size`` bytes en ocho ventanas repartidas por el archivo."""
+        size = os.path.getsize(input_file)
+        with open(input_file, 'rb') as f:
+            if size <= self.sample_size:
+                return f.read()
+            windows = 8
+            window = self.sample_size // windows
+            parts = []
+            for i in range(windows):
+                f.seek(i * (size - window) // (windows - 1))
+                part = f.read(window)
+                if i:  # Empezamos en una fila completa
+                    part = part[part.find(b'\n') + 1:]
+                parts.append(part)
+            return b''.join(parts)
+
+    @staticmethod
+    def data_kind(input_file: str, sample: bytes) -> str:
+        """Tipo de datos para el perfil guardado: tbl, incompressible, text o binary."""
+        if input_file.endswith('.tbl'):
+            return 'tbl'
+        head = sample[:64 * 1024]
+        if not head:
+            return 'binary'
+        if len(zlib.compress(head, level=1)) >= len(head) * 0.9:
+            return 'incompressible'
+        counts = np.bincount(np.frombuffer(head, dtype=np.uint8), minlength=256)
+        printable = counts[32:127].sum() + counts[[9, 10, 13]].sum()
+        return 'text' if printable >= 0.95 * len(head) else 'binary'
+
+    def measure(self, probe, sample: bytes, settings: dict) -> dict:
+        """Comprime la muestra en memoria con ``settings`` y devuelve velocidad (MB/s) y ratio."""
+        probe.apply_tuning(settings)
+        start = time.perf_counter()
+        compressed = sum(len(part) for part in probe.iter_compress([sample]))
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        return dict(settings, speed=len(sample) / (1024 * 1024) / elapsed,
+                    ratio=compressed / max(len(sample), 1))
+
+    def choose(self, results: list) -> dict:
+        """El mejor resultado que cumple el objetivo o, si ninguno lo cumple, el más cercano."""
+        target = self.target
+        valid = [r for r in results
+                 if (target['min_speed'] is None or r['speed'] >= target['min_speed'])
+                 and (target['max_ratio'] is None or r['ratio'] <= target['max_ratio'])]
+        if not valid:
+            # Se incumple el objetivo: priorizamos la restricción que haya
+            objective = 'speed' if target['min_speed'] is not None else 'ratio'
+            valid = results
+        else:
+            objective = target['objective']
+        if objective == 'speed':
+            return max(valid, key=lambda r: (r['speed'], -r['ratio']))
+        return min(valid, key=lambda r: (round(r['ratio'], 4), -r['speed']))
+
+    def meets(self, result: dict) -> bool:
+        return ((self.target['min_speed'] is None or result['speed'] >= self.target['min_speed'])
+                and (self.target['max_ratio'] is None or result['ratio'] <= self.target['max_ratio']))
+
+    def tune(self, input_file: str) -> dict:
+        """Mide la muestra de ``input_file`` y devuelve el perfil elegido (sin guardarlo)."""
+        sample = self.sample(input_file)
+        kind = self.data_kind(input_file, sample)
+        engine = self.engine
+        workers = engine.workers
+        print(f"\nAutoajuste ({tuning_target_key(self.target)}) sobre {len(sample)/1024/1024:.2f} MB de muestra [{kind}]")
+
+        # Motor de pruebas con las mismas opciones; la muestra se comprime en memoria
+        dictionary = engine.dictionaries.get(engine.dictionary_id) if engine.dictionary_id else None
+        probe = DoekPlanetEngine(workers=workers, precondition=engine.precondition, progress=None,
+                                 columnar=kind == 'tbl' if engine.columnar is None else engine.columnar,
+                                 dictionary=dictionary)
+        with probe:
+            # 1) Cascada de etapas con el tamaño de bloque por defecto
+            results = [self.measure(probe, sample, {'block_size': 256 * 1024, 'stages': stages, 'workers': workers})
+                       for stages in TUNING_CASCADES]
+            best = self.choose(results)
+            # 2) Tamaño de bloque para esa cascada
+            results = [best] + [self.measure(probe, sample, dict(best, block_size=size))
+                                for size in TUNING_BLOCK_SIZES if size != best['block_size']]
+            best = self.choose(results)
+            # 3) Hilos: los mínimos que rinden como el mejor (±5%) sin perder el objetivo
+            counts = sorted({1 << i for i in range(workers.bit_length()) if 1 << i < workers} | {workers})
+            results = [best if count == workers else self.measure(probe, sample, dict(best, workers=count))
+                       for count in counts]
+        fastest = max(r['speed'] for r in results)
+        best = next((r for r in results
+                     if r['speed'] >= 0.95 * fastest and (self.meets(r) or not self.meets(best))), best)
+
+        if not self.meets(best):
+            print("Aviso: ninguna configuración cumple el objetivo; se usa la más cercana")
+        print(f"Perfil elegido: bloque {best['block_size'] // 1024}KB, "
+              f"etapas {[stage[1] + str(stage[2]) for stage in best['stages']]}, {best['workers']} hilos "
+              f"({best['speed']:.1f} MB/s, ratio {best['ratio']:.3f})")
+        return dict(best, stages=[list(stage) for stage in best['stages']], kind=kind,
+                    target=tuning_target_key(self.target), cpus=multiprocessing.cpu_count(),
+                    tuned_at=time.time())
+
+    def _key(self, kind: str) -> str:
+        return f"{kind}|{tuning_target_key(self.target)}"
+
+    def load(self) -> dict:
+        """Perfiles guardados; un archivo ausente o dañado equivale a ninguno."""
+        try:
+            with open(self.tuning_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, settings: dict):
+        profiles = self.load()
+        profiles[self._key(settings['kind'])] = settings
+        temporary = self.tuning_file + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(profiles, f, indent=2, sort_keys=True)
+        os.replace(temporary, self.tuning_file)
+
+    def profile_for(self, input_file: str, retune: bool = False) -> dict:
+        """
+        Perfil guardado para el tipo de datos de ``input_file`` y este
+        objetivo; si no existe, se midió en otra máquina o ``retune``, se
+        ajusta ahora y se guarda.
+        """
+        if not retune:
+            kind = self.data_kind(input_file, self.sample_head(input_file))
+            settings = self.load().get(self._key(kind))
+            if settings and settings.get('cpus') == multiprocessing.cpu_count():
+                print(f"\nUsando perfil autoajustado [{kind}]: bloque {settings['block_size'] // 1024}KB, "
+                      f"{settings['workers']} hilos")
+                return settings
+        settings = self.tune(input_file)
+        self.save(settings)
+        return settings
+
+    @staticmethod
+    def sample_head(input_file: str) -> bytes:
+        with open(input_file, 'rb') as f:
+            return f.read(64 * 1024)
+
 def print_compression_stats(original_file: str, compressed_file: str, metrics: dict):
     """Estadísticas detalladas de compresión."""
     original_size = os.path.getsize(original_file)
     compressed_size = os.path.getsize(compressed_file)
     ratio = (compressed_size / original_size) * 100
     cpu_metrics = metrics['cpu_metrics']
-    field_metrics = metrics['field_metrics']
+    classifier_metrics = metrics['classifier_metrics']
+    dedup_metrics = metrics['dedup_metrics']
 
     print(f"""
 ╔════ DOEK Quantum Field Processor v12.0 ════╗
@@ -431,25 +3233,30 @@ def print_compression_stats(original_file: str, compressed_file: str, metrics: d
 ║ ├─ Avg CPU Time: {cpu_metrics['avg_cpu_time']*1000:.2f}ms
 ║ └─ CPU Operations: {cpu_metrics['cpu_operations']}
 ║
-║ Quantum Field Metrics:
-║ ├─ Avg Strength: {field_metrics['avg_field_strength']:.4f}
-║ ├─ Max Strength: {field_metrics['max_field_strength']:.4f}
-║ └─ Min Strength: {field_metrics['min_field_strength']:.4f}
+║ Block Classifier:
+║ ├─ Probes: {classifier_metrics['probes']}
+║ ├─ Predictions: {classifier_metrics['predictions']}
+║ └─ Mispredictions: {classifier_metrics['mispredictions']} ({classifier_metrics['misprediction_rate']*100:.1f}%)
+║
+║ Deduplication:
+║ ├─ Chunks: {dedup_metrics['chunks']}
+║ ├─ Hits: {dedup_metrics['hits']} ({dedup_metrics['hit_rate']*100:.1f}%)
+║ └─ Bytes Saved: {dedup_metrics['bytes_saved']/1024/1024:.2f} MB
 ║
 ║ Method Analysis:
 ║ ├─ Direct: {metrics['method_usage'].get('direct', 0)} blocks
-║ ├─ Doek: {metrics['method_usage'].get('Doek', 0)} blocks
 ║ ├─ Aggressive: {metrics['method_usage'].get('aggressive', 0)} blocks
-║ └─ None: {metrics['method_usage'].get('none', 0)} blocks
+║ ├─ None: {metrics['method_usage'].get('none', 0)} blocks
+║ └─ Preconditioned: {sum(metrics['filter_usage'].values())} blocks {dict(metrics['filter_usage'])}
 ║
 ║ Average Block Times:
 ║ ├─ Direct: {metrics['average_times'].get('direct', 0):.4f}s
-║ ├─ Doek: {metrics['average_times'].get('Doek', 0):.4f}s
 ║ └─ Aggressive: {metrics['average_times'].get('aggressive', 0):.4f}s
 ╚═══════════════════════════════════════╝
 """)
 
-if __name__ == "__main__":
+def run_demo():
+    """Compresión y descompresión de prueba sobre ``datasetprueba.tbl``."""
     engine = DoekPlanetEngine()
     
     input_file = "datasetprueba.tbl"
@@ -472,3 +3279,164 @@ if __name__ == "__main__":
             print("\nError: La descompresión falló.")
     else:
         print("\nError: La compresión falló.")
+
+def main(argv=None):
+    """
+    Línea de comandos. Sin argumentos ejecuta la demo; ``-`` como entrada o
+    salida usa stdin/stdout con el formato de flujo.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DOEK Quantum Field Processor")
+    parser.add_argument('--workers', type=int, default=None, help="Hilos de compresión")
+    parser.add_argument('--profile', choices=sorted(COMPRESSION_PROFILES), default='balanced',
+                        help="Perfil de compresión")
+    parser.add_argument('--columnar', action='store_true', default=None,
+                        help="Modo columnar para filas '|' (automático en archivos .tbl)")
+    parser.add_argument('--dedup', action='store_true', help="Deduplicación por troceado de contenido")
+    parser.add_argument('--stats', action='store_true',
+                        help="Resumen por columna en cada bloque de filas '|' (para scan)")
+    parser.add_argument('--dictionary', default=None, help="Diccionario zlib entrenado (train-dict)")
+    parser.add_argument('--external-dictionary', action='store_true',
+                        help="Guardar solo el id del diccionario, no el diccionario")
+    parser.add_argument('--block-size', type=int, default=None, help="Tamaño de bloque en bytes")
+    parser.add_argument('--autotune', type=parse_tuning_target, default=None, metavar='OBJETIVO',
+                        help="Autoajuste: '400MB/s', '2s/GB', 'ratio<=0.3', 'ratio' o 'speed' (combinables con comas)")
+    parser.add_argument('--tuning-file', default=TUNING_FILE, help="Perfiles autoajustados guardados")
+    parser.add_argument('--metrics', default=None,
+                        help="Archivo de métricas, actualizado durante el proceso (.prom: Prometheus; si no, JSON)")
+    commands = parser.add_subparsers(dest='command')
+    for name in ('compress', 'decompress'):
+        command = commands.add_parser(name)
+        command.add_argument('input', help="Archivo de entrada o '-' para stdin")
+        command.add_argument('output', nargs='?', default=None, help="Archivo de salida o '-' para stdout")
+    tree = commands.add_parser('compress-tree', help="Empaqueta un directorio en un único archivo")
+    tree.add_argument('input', help="Directorio a empaquetar")
+    tree.add_argument('output', nargs='?', default=None, help="Archivo de salida")
+    extract = commands.add_parser('extract', help="Extrae miembros de un archivo multi-miembro")
+    extract.add_argument('input', help="Archivo multi-miembro")
+    extract.add_argument('output', nargs='?', default=None, help="Directorio de destino")
+    extract.add_argument('--members', nargs='+', default=None, help="Extraer solo estos miembros")
+    append = commands.add_parser('append', help="Añade datos al final de un archivo .doek")
+    append.add_argument('archive', help="Archivo .doek indexado")
+    append.add_argument('input', help="Datos a añadir")
+    sync = commands.add_parser('sync', help="Recomprime solo los bloques que cambiaron en el origen")
+    sync.add_argument('input', help="Archivo original actualizado")
+    sync.add_argument('archive', help="Archivo .doek a sincronizar")
+    tune = commands.add_parser('tune', help="Mide y guarda el perfil autoajustado para un archivo")
+    tune.add_argument('input', help="Archivo representativo")
+    verify = commands.add_parser('verify', help="Comprueba checksums de bloques sin escribir nada")
+    verify.add_argument('archives', nargs='+', help="Archivos .doek a comprobar")
+    verify.add_argument('--quick', action='store_true',
+                        help="Solo el CRC32 de los datos comprimidos, sin descomprimir")
+    scan = commands.add_parser('scan', help="Filtra filas de un .tbl comprimido saltando bloques")
+    scan.add_argument('input', help="Archivo .doek")
+    scan.add_argument('column', type=int, help="Columna a filtrar (base 0)")
+    scan.add_argument('operator', choices=BlockStats.OPERATORS)
+    scan.add_argument('values', nargs='*', help="Valores del predicado (números o texto)")
+    listing = commands.add_parser('list', help="Lista los miembros de un archivo multi-miembro")
+    listing.add_argument('input', help="Archivo multi-miembro")
+    train = commands.add_parser('train-dict')
+    train.add_argument('output', help="Archivo de diccionario a crear")
+    train.add_argument('samples', nargs='+', help="Archivos de muestra representativos")
+    train.add_argument('--size', type=int, default=32 * 1024, help="Tamaño del diccionario en bytes")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        run_demo()
+        return 0
+
+    if args.command == 'train-dict':
+        dict_id = save_dictionary(train_dictionary(args.samples, size=args.size), args.output)
+        print(f"Diccionario {dict_id:08x} guardado en {args.output}")
+        return 0
+
+    # Los mensajes de progreso van a stderr para no mezclarse con los datos.
+    stdout = sys.stdout.buffer
+    with contextlib.redirect_stdout(sys.stderr):
+        dictionary = load_dictionary(args.dictionary) if args.dictionary else None
+        engine = DoekPlanetEngine(workers=args.workers, profile=args.profile, columnar=args.columnar,
+                                  dedup=args.dedup, dictionary=dictionary,
+                                  embed_dictionary=not args.external_dictionary, block_size=args.block_size,
+                                  autotune=args.autotune, tuning_file=args.tuning_file, stats=args.stats)
+        if args.metrics:
+            dump_metrics = metrics_file_hook(engine.metrics, args.metrics)
+            engine.metrics.add_hook(dump_metrics)
+        try:
+            with engine:
+                return _run_command(engine, args, stdout)
+        finally:
+            if args.metrics:
+                dump_metrics()
+
+def _run_command(engine, args, stdout) -> int:
+    """Ejecuta compress/decompress sobre archivos o, con ``-``, como flujo."""
+    if args.command == 'compress-tree':
+        return 0 if engine.compress_tree(args.input, args.output) else 1
+    if args.command == 'extract':
+        return 0 if engine.extract(args.input, args.output, args.members) else 1
+    if args.command == 'append':
+        return 0 if engine.append(args.archive, args.input) else 1
+    if args.command == 'sync':
+        return 0 if engine.sync(args.input, args.archive) else 1
+    if args.command == 'tune':
+        settings = engine.tune(args.input, retune=True)
+        stdout.write((json.dumps(settings, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+        return 0
+    if args.command == 'verify':
+        reports = [engine.verify(archive, decode=not args.quick) for archive in args.archives]
+        return 0 if all(report['ok'] for report in reports) else 1
+    if args.command == 'scan':
+        return _run_scan(engine, args, stdout)
+    if args.command == 'list':
+        for member in engine.list_members(args.input):
+            stdout.write(f"{member['size']:>12} {member['blocks']:>6} {member['checksum']} {member['name']}\n".encode('utf-8'))
+        return 0
+
+    streaming = args.input == '-' or args.output == '-'
+
+    if not streaming:
+        if args.command == 'compress':
+            return 0 if engine.compress(args.input, args.output) else 1
+        return 0 if engine.decompress(args.input, args.output) else 1
+
+    reader = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    writer = stdout if args.output in (None, '-') else open(args.output, 'wb')
+    try:
+        if args.command == 'compress':
+            engine.compress_stream(reader, writer)
+        else:
+            engine.decompress_stream(reader, writer)
+        writer.flush()
+    finally:
+        if reader is not sys.stdin.buffer:
+            reader.close()
+        if writer is not stdout:
+            writer.close()
+    return 0
+
+def _scan_value(text: str):
+    """Valor de predicado desde la línea de comandos: número si lo parece, si no texto."""
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+def _run_scan(engine, args, stdout) -> int:
+    values = [_scan_value(value) for value in args.values]
+    predicate = (args.operator, values) if args.operator == 'in' else (args.operator, *values)
+    try:
+        for row in engine.scan(args.input, args.column, predicate):
+            stdout.write(b'|'.join(row) + b'\n')
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    counters = engine.performance_metrics['scan']
+    print(f"Bloques: {counters['blocks']}, saltados: {counters['skipped']}, "
+          f"descomprimidos: {counters['decoded']}, filas: {counters['rows']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
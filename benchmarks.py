@@ -0,0 +1,416 @@
+# DOEK Quantum Field Compressor - Benchmarks
+# Copyright 2025 DOEK Technologies
+# @DOEKUNIVERSE - CHILE
+
+# Suite de benchmarks reproducible:
+#   run      corpus sintéticos deterministas x tamaños de bloque x perfiles x
+#            hilos; MB/s, ratio, RSS máximo y tiempo por etapa (percentiles),
+#            guardado en JSON.
+#   compare  contrasta un resultado con una línea base y marca regresiones.
+#   io       ruta sin copias (mmap + memoryview + writev) frente a read()/write().
+# Cada caso corre en un subproceso propio para que el RSS medido sea solo el suyo.
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from DoekQuantumField_Processor import COMPRESSION_PROFILES, DoekPlanetEngine
+
+DEFAULT_SEED = 0x444F454B
+
+
+def _write_chunks(path: str, size: int, make_chunk):
+    """Escribe trozos de ``make_chunk()`` hasta completar exactamente ``size`` bytes."""
+    written = 0
+    with open(path, 'wb') as out:
+        while written < size:
+            chunk = make_chunk()[:size - written]
+            out.write(chunk)
+            written += len(chunk)
+
+
+def generate_tbl(path: str, size: int, rng):
+    """Filas tipo TPC-H ``lineitem`` separadas por '|'."""
+    modes = ['AIR', 'MAIL', 'RAIL', 'SHIP', 'TRUCK', 'REG AIR', 'FOB']
+    instructs = ['DELIVER IN PERSON', 'COLLECT COD', 'NONE', 'TAKE BACK RETURN']
+    words = ['carefully', 'final', 'deposits', 'regular', 'ideas', 'quickly', 'express',
+             'packages', 'accounts', 'furiously', 'pending', 'requests', 'blithely', 'even']
+    state = {'order': 1}
+
+    def make_chunk():
+        rows = []
+        for _ in range(1024):
+            order = state['order']
+            state['order'] += int(rng.integers(1, 4))
+            quantity = int(rng.integers(1, 51))
+            day = int(rng.integers(0, 2557))
+            ship = f"{1992 + day // 365}-{day % 365 // 31 + 1:02d}-{day % 28 + 1:02d}"
+            comment = ' '.join(words[i] for i in rng.integers(len(words), size=int(rng.integers(2, 7))))
+            rows.append(
+                f"{order}|{int(rng.integers(1, 200000))}|{int(rng.integers(1, 10000))}|"
+                f"{int(rng.integers(1, 8))}|{quantity}|{quantity * int(rng.integers(900, 2000)) / 100:.2f}|"
+                f"0.{int(rng.integers(0, 11)):02d}|0.0{int(rng.integers(0, 9))}|"
+                f"{'ANR'[int(rng.integers(3))]}|{'OF'[int(rng.integers(2))]}|{ship}|{ship}|{ship}|"
+                f"{instructs[int(rng.integers(len(instructs)))]}|{modes[int(rng.integers(len(modes)))]}|{comment}|\n"
+            )
+        return ''.join(rows).encode()
+
+    _write_chunks(path, size, make_chunk)
+
+
+def generate_logs(path: str, size: int, rng):
+    """Texto de log con marcas de tiempo crecientes, niveles, componentes e ids."""
+    levels = ['INFO', 'INFO', 'INFO', 'DEBUG', 'WARN', 'ERROR']
+    components = ['api', 'db', 'cache', 'scheduler', 'auth', 'worker']
+    messages = ['request served in {} ms', 'cache miss for key user:{}', 'retrying job {} after timeout',
+                'connection pool size {}', 'user {} logged in', 'query took {} ms']
+    state = {'ts': 1_700_000_000_000}
+
+    def make_chunk():
+        lines = []
+        for _ in range(2048):
+            state['ts'] += int(rng.integers(0, 250))
+            message = messages[int(rng.integers(len(messages)))].format(int(rng.integers(0, 100000)))
+            lines.append(f"{state['ts']} {levels[int(rng.integers(len(levels)))]:<5} "
+                         f"[{components[int(rng.integers(len(components)))]}] {message}\n")
+        return ''.join(lines).encode()
+
+    _write_chunks(path, size, make_chunk)
+
+
+def generate_random(path: str, size: int, rng):
+    """Bytes aleatorios (incompresibles)."""
+    _write_chunks(path, size, lambda: rng.bytes(1 << 20))
+
+
+def generate_sparse(path: str, size: int, rng):
+    """Binario disperso: enteros de 32 bits casi todos cero."""
+    def make_chunk():
+        values = np.zeros(1 << 18, dtype='<u4')
+        positions = rng.integers(0, len(values), size=len(values) // 100)
+        values[positions] = rng.integers(1, 2 ** 32, size=len(positions), dtype=np.uint32)
+        return values.tobytes()
+
+    _write_chunks(path, size, make_chunk)
+
+
+def generate_compressed(path: str, size: int, rng):
+    """Datos ya comprimidos: trozos de log pasados por zlib."""
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'logs')
+        generate_logs(source, 1 << 20, rng)
+        with open(source, 'rb') as f:
+            text = f.read()
+
+    def make_chunk():
+        start = int(rng.integers(0, len(text) - 65536))
+        return zlib.compress(text[start:start + 65536], 6)
+
+    _write_chunks(path, size, make_chunk)
+
+
+def generate_mixed(path: str, size: int, rng):
+    """Mezcla de texto repetitivo, enteros crecientes y ruido."""
+    words = [b'quantum', b'field', b'doek', b'shard', b'fold', b'planet', b'12345', b'|']
+
+    def make_chunk():
+        kind = rng.integers(3)
+        if kind == 0:
+            return b' '.join(words[i] for i in rng.integers(len(words), size=16384))
+        if kind == 1:
+            return np.cumsum(rng.integers(0, 4, size=65536), dtype='<u4').tobytes()
+        return rng.bytes(131072)
+
+    _write_chunks(path, size, make_chunk)
+
+
+# Corpus: nombre -> (generador, extensión). La extensión .tbl activa el modo columnar.
+CORPORA = {
+    'tbl': (generate_tbl, '.tbl'),
+    'logs': (generate_logs, '.log'),
+    'random': (generate_random, '.bin'),
+    'sparse': (generate_sparse, '.bin'),
+    'compressed': (generate_compressed, '.bin'),
+    'mixed': (generate_mixed, '.bin'),
+}
+
+
+def generate_corpus(name: str, size: int, workdir: str, seed: int = DEFAULT_SEED) -> str:
+    """Genera (o reutiliza) el corpus ``name`` de ``size`` bytes y devuelve su ruta."""
+    generator, extension = CORPORA[name]
+    path = os.path.join(workdir, f"{name}-{size}-{seed:x}{extension}")
+    if not os.path.exists(path):
+        generator(path, size, np.random.default_rng([seed, sorted(CORPORA).index(name)]))
+    return path
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _max_rss_mb() -> float:
+    """RSS máximo del proceso en MB: ``ru_maxrss`` va en KB en Linux y en bytes en macOS."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def run_child(config: dict) -> dict:
+    """
+    Ejecuta un caso en este proceso: comprime, descomprime y verifica el
+    resultado. Devuelve tiempos, tamaños, RSS máximo y métricas por etapa.
+    """
+    source = config['source']
+    archive = config['archive']
+    restored = config['restored']
+    engine = DoekPlanetEngine(workers=config['workers'], profile=config['profile'],
+                              zero_copy=config.get('zero_copy', True), progress=None)
+    engine.block_size = config['block_size']
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), engine:
+        start = time.perf_counter()
+        compressed = engine.compress(source, archive)
+        compress_seconds = time.perf_counter() - start
+        if compressed is None:
+            raise RuntimeError(f"La compresión falló para {source}")
+        start = time.perf_counter()
+        decompressed = engine.decompress(archive, restored)
+        decompress_seconds = time.perf_counter() - start
+        if decompressed is None:
+            raise RuntimeError(f"La descompresión falló para {archive}")
+
+    result = {
+        'compress_seconds': compress_seconds,
+        'decompress_seconds': decompress_seconds,
+        'original_size': os.path.getsize(source),
+        'compressed_size': os.path.getsize(archive),
+        'max_rss_mb': _max_rss_mb(),
+        'stages': engine.metrics.to_dict()['stages'],
+    }
+    if config.get('verify', True):
+        result['verified'] = _file_digest(source) == _file_digest(restored)
+    return result
+
+
+def run_case(config: dict) -> dict:
+    """Lanza ``run_child`` en un subproceso nuevo y recoge su resultado JSON."""
+    for path in (config['archive'], config['restored']):
+        if os.path.exists(path):
+            os.remove(path)  # Sobrescribir obliga a esperar el writeback del archivo anterior
+    command = [sys.executable, os.path.abspath(__file__), '--child', json.dumps(config)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _summarize_stages(runs: list) -> dict:
+    """Tiempo por etapa (suma de sus etiquetas) y percentiles por bloque de la corrida más rápida."""
+    best = min(runs, key=lambda run: run['compress_seconds'] + run['decompress_seconds'])
+    summary = {}
+    for stage, labels in best['stages'].items():
+        summary[stage] = {
+            'seconds': sum(label['sum'] for label in labels.values()),
+            'count': sum(label['count'] for label in labels.values()),
+            'p50': max(label['p50'] for label in labels.values()),
+            'p90': max(label['p90'] for label in labels.values()),
+            'p99': max(label['p99'] for label in labels.values()),
+            'labels': labels,
+        }
+    return summary
+
+
+def _aggregate(case: dict, runs: list) -> dict:
+    """Mediana de las repeticiones, con el mínimo y el máximo como medida de ruido."""
+    size_mb = runs[0]['original_size'] / (1024 * 1024)
+    result = dict(case)
+    for operation in ('compress', 'decompress'):
+        speeds = [size_mb / run[f'{operation}_seconds'] for run in runs]
+        result[f'{operation}_mb_s'] = statistics.median(speeds)
+        result[f'{operation}_mb_s_range'] = [min(speeds), max(speeds)]
+    # Con varios hilos la caché de decisiones se llena en orden variable y el ratio puede variar
+    ratios = [run['compressed_size'] / run['original_size'] * 100 for run in runs]
+    result['ratio'] = statistics.median(ratios)
+    result['ratio_range'] = [min(ratios), max(ratios)]
+    result['max_rss_mb'] = max(run['max_rss_mb'] for run in runs)
+    result['verified'] = all(run.get('verified', True) for run in runs)
+    result['stages'] = _summarize_stages(runs)
+    return result
+
+
+def _case_key(result: dict) -> tuple:
+    return result['corpus'], result['block_size'], result['profile'], result['workers']
+
+
+def run_suite(corpora: list, block_sizes: list, profiles: list, workers: list, size: int,
+              repeat: int, workdir: str, seed: int = DEFAULT_SEED, log=print) -> dict:
+    """Ejecuta la matriz completa y devuelve el documento de resultados."""
+    results = []
+    for corpus in corpora:
+        source = generate_corpus(corpus, size, workdir, seed)
+        for block_size in block_sizes:
+            for profile in profiles:
+                for count in workers:
+                    case = {'corpus': corpus, 'block_size': block_size, 'profile': profile, 'workers': count}
+                    config = dict(case, source=source, archive=os.path.join(workdir, 'case.doek'),
+                                  restored=os.path.join(workdir, 'case.out'))
+                    result = _aggregate(case, [run_case(config) for _ in range(repeat)])
+                    results.append(result)
+                    log(_format_result(result))
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'parameters': {'size': size, 'repeat': repeat, 'seed': seed},
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> list:
+    """
+    Compara dos documentos de resultados y devuelve las regresiones como
+    tuplas (caso, métrica, antes, después). La velocidad regresa si la
+    mediana cae más de ``threshold`` y además queda por debajo del mínimo
+    medido en la línea base, así el ruido entre repeticiones no cuenta.
+    """
+    baseline_cases = {_case_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = baseline_cases.get(_case_key(result))
+        if base is None:
+            continue
+        for operation in ('compress', 'decompress'):
+            metric = f'{operation}_mb_s'
+            low = base.get(f'{metric}_range', [base[metric]])[0]
+            if result[metric] < base[metric] * (1 - threshold) and result[metric] < low:
+                regressions.append((_case_key(result), metric, base[metric], result[metric]))
+        # El ratio casi no tiene ruido: basta un margen de una décima de la tolerancia
+        high = base.get('ratio_range', [base['ratio']])[-1]
+        if result['ratio'] > base['ratio'] * (1 + threshold / 10) and result['ratio'] > high:
+            regressions.append((_case_key(result), 'ratio', base['ratio'], result['ratio']))
+        if result['max_rss_mb'] > base['max_rss_mb'] * (1 + threshold):
+            regressions.append((_case_key(result), 'max_rss_mb', base['max_rss_mb'], result['max_rss_mb']))
+        if not result['verified']:
+            regressions.append((_case_key(result), 'verified', True, False))
+    return regressions
+
+
+def benchmark_io(size_mb: int, workers: int, repeat: int, workdir: str) -> list:
+    """Mide compresión y descompresión con y sin zero-copy sobre el mismo corpus."""
+    source = generate_corpus('mixed', size_mb * 1024 * 1024, workdir)
+    results = []
+    for zero_copy in (False, True):
+        case = {'corpus': 'mixed', 'block_size': 256 * 1024, 'profile': 'balanced',
+                'workers': workers, 'zero_copy': zero_copy}
+        config = dict(case, source=source, archive=os.path.join(workdir, 'io.doek'),
+                      restored=os.path.join(workdir, 'io.out'))
+        results.append(_aggregate(case, [run_case(config) for _ in range(repeat)]))
+    return results
+
+
+def _format_result(result: dict) -> str:
+    stages = ' '.join(f"{stage}={info['seconds']:.3f}s" for stage, info in sorted(result['stages'].items()))
+    return (f"{result['corpus']:<11}{result['block_size'] // 1024:>6}K {result['profile']:<9}"
+            f"{result['workers']:>4} {result['compress_mb_s']:>9.1f}{result['decompress_mb_s']:>9.1f}"
+            f"{result['ratio']:>8.2f}%{result['max_rss_mb']:>8.1f}MB "
+            f"{'ok' if result['verified'] else 'FALLO'}  {stages}")
+
+
+def _int_list(text: str) -> list:
+    return [int(item) for item in text.split(',') if item]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == '--child':
+        print(json.dumps(run_child(json.loads(argv[1]))))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Benchmarks de DOEK Quantum Field Compressor")
+    commands = parser.add_subparsers(dest='command')
+
+    run = commands.add_parser('run', help="Ejecuta la matriz de benchmarks")
+    run.add_argument('--corpora', default=','.join(CORPORA), help="Corpus separados por comas")
+    run.add_argument('--block-sizes', default='64,256,1024', help="Tamaños de bloque en KB")
+    run.add_argument('--profiles', default=','.join(COMPRESSION_PROFILES), help="Perfiles de compresión")
+    run.add_argument('--workers', default=f"1,{os.cpu_count() or 1}", help="Números de hilos")
+    run.add_argument('--size-mb', type=int, default=8, help="Tamaño de cada corpus")
+    run.add_argument('--repeat', type=int, default=3, help="Repeticiones por caso (se reporta la mediana)")
+    run.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Semilla de los corpus")
+    run.add_argument('--workdir', default=None, help="Directorio para los corpus (se reutilizan) y temporales")
+    run.add_argument('--output', default=None, help="Archivo JSON de resultados")
+
+    compare_parser = commands.add_parser('compare', help="Compara resultados con una línea base")
+    compare_parser.add_argument('baseline', help="JSON de la línea base")
+    compare_parser.add_argument('current', help="JSON de resultados actuales")
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help="Tolerancia relativa")
+
+    io_parser = commands.add_parser('io', help="E/S sin copias frente a read()/write()")
+    io_parser.add_argument('--size-mb', type=int, default=128, help="Tamaño del corpus sintético")
+    io_parser.add_argument('--workers', type=int, default=None, help="Hilos de compresión")
+    io_parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por variante")
+    args = parser.parse_args(argv or ['run'])
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        for key, metric, before, after in regressions:
+            print(f"REGRESIÓN {'/'.join(map(str, key))} {metric}: {before:.2f} -> {after:.2f}")
+        print(f"{len(regressions)} regresiones en {len(current['results'])} casos")
+        return 1 if regressions else 0
+
+    if args.command == 'io':
+        workers = args.workers or os.cpu_count() or 1
+        with tempfile.TemporaryDirectory() as workdir:
+            results = benchmark_io(args.size_mb, workers, args.repeat, workdir)
+        print(f"{'operación':<12}{'zero-copy':>10}{'MB/s':>10}{'RSS máx (MB)':>14}")
+        for result in results:
+            for operation in ('compress', 'decompress'):
+                print(f"{operation:<12}{'sí' if result['zero_copy'] else 'no':>10}"
+                      f"{result[f'{operation}_mb_s']:>10.1f}{result['max_rss_mb']:>14.1f}")
+        return 0
+
+    corpora = [name for name in args.corpora.split(',') if name]
+    profiles = [name for name in args.profiles.split(',') if name]
+    unknown = (set(corpora) - set(CORPORA)) | (set(profiles) - set(COMPRESSION_PROFILES))
+    if unknown:
+        parser.error(f"Corpus o perfil desconocido: {', '.join(sorted(unknown))}")
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(workdir, exist_ok=True)
+        print(f"{'corpus':<11}{'bloque':>7} {'perfil':<9}{'hilos':>4} {'comp MB/s':>9}{'desc MB/s':>9}"
+              f"{'ratio':>9}{'RSS':>10}")
+        document = run_suite(corpora, [kb * 1024 for kb in _int_list(args.block_sizes)], profiles,
+                             sorted(set(_int_list(args.workers))), args.size_mb * 1024 * 1024,
+                             args.repeat, workdir, args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+    return 0 if all(result['verified'] for result in document['results']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())